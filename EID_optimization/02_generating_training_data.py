@@ -1,152 +1,27 @@
 import numpy as np
-import numpy.random as rdm
 import networkx as nx
 import pandas as pd
 from joblib import Parallel, delayed
 from scipy import stats
 import warnings
-import EoN
 import random
-import time
 import multiprocessing
-from scipy import stats
+from eidopt import network_generator, probability_generate, greedy_max_influence
+from eidopt.greedy import tie_unranked
+from eidopt.checkpoint import NetworkCheckpoint, network_seed, seed_network
+from eidopt.dataset import TrainingDatasetWriter
+from eidopt.scheduler import estimate_network_cost, run_largest_first
+from eidopt.jobs import JobTable, drain
 
 warnings.filterwarnings('ignore')
 
-# ========== Network Generation Functions ==========
-def heterogeneous_dist(ID_list, mean_degree, heterogeneity):
-    degree = {}
-    for ID in ID_list:
-        degree[ID] = mean_degree
-
-    while np.std([degree[ID] for ID in ID_list]) < heterogeneity:
-        source_list = [ID for ID in ID_list if degree[ID] > 1]
-        if not source_list:
-            break
-        random_node = source_list[int(rdm.random() * len(source_list))]
-
-        r = rdm.random() * len(ID_list) * mean_degree
-
-        k = 0
-        target_node = ID_list[k]
-        slide = degree[target_node]
-        while slide < r and k < len(ID_list) - 1:
-            k = k + 1
-            target_node = ID_list[k]
-            slide = slide + degree[target_node]
-
-        degree[random_node] -= 1
-        degree[target_node] += 1
-
-    return degree
-
-def connect_stubs(stubs, edge_list):
-    stubs = [(s[0], s[1]) for s in rdm.permutation(stubs)]
-
-    if len(stubs) < 2:
-        no_more_edges = True
-    else:
-        no_more_edges = False
-
-    while no_more_edges == False:
-        if not stubs:
-            break
-        source = stubs.pop(0)
-
-        found = False
-        stubs_to_check = len(stubs)
-
-        while found == False and no_more_edges == False:
-            if not stubs:
-                no_more_edges = True
-                break
-            target = stubs.pop(0)
-
-            new_edge = sorted([source, target])
-            if new_edge in edge_list or source == target:
-                stubs.append(target)
-            else:
-                edge_list.append(new_edge)
-                found = True
-
-            stubs_to_check = stubs_to_check - 1
-            if stubs_to_check < 2:
-                no_more_edges = True
-
-    return edge_list
-
-def modular_config_model(module_size, number_of_modules, p, heterogeneity, mean_degree):
-    ID_list = []
-    for m in range(number_of_modules):
-        for n in range(module_size):
-            node_ID = (m, n)
-            ID_list.append(node_ID)
-
-    degree = heterogeneous_dist(ID_list, mean_degree, heterogeneity)
-
-    edge_list = []
-    inter_stubs = []
-
-    for m in range(number_of_modules):
-        intra_stubs = []
-        for n in range(module_size):
-            for i in range(degree[(m, n)]):
-                r = rdm.random()
-                if r < p:
-                    intra_stubs.append((m, n))
-                else:
-                    inter_stubs.append((m, n))
-
-        new_edges = connect_stubs(intra_stubs, edge_list)
-        edge_list = edge_list + new_edges
-
-    new_edges = connect_stubs(inter_stubs, edge_list)
-    edge_list = edge_list + new_edges
-
-    return ID_list, edge_list
-
-def network_generator(module_size, number_of_modules, p, heterogeneity, mean_degree):
-    ID = []
-    edge = []
-    ID2, edge2 = modular_config_model(module_size, number_of_modules, p, heterogeneity, mean_degree)
-    for i in ID2:
-        ID.append(str(i))
-    for i in edge2:
-        x = []
-        for j in i:
-            j = tuple(map(int, j))
-            x.append(str(j))
-        edge.append(x)
-    return ID, edge
-
-# ========== Emergence probability generation functions ==========
-def unique_ranks(data):
-    indexed_data = [(value, index) for index, value in enumerate(data)]
-    sorted_data = sorted(indexed_data, key=lambda x: x[0])
-    ranks = [0] * len(data)
-    for rank, (_, original_index) in enumerate(sorted_data):
-        ranks[original_index] = rank
-    return ranks
-
-def probability_generate(G, alpha, beta, corr, s):
-    probabilities = list(np.random.beta(alpha, beta, s))
-    importance = [t[1] for t in nx.algorithms.centrality.degree_centrality(G).items()]
-    nodes = list(G.nodes)
-    mean = [0, 0]
-    cov = [[1, corr], [corr, 1]]
-    samples = np.random.multivariate_normal(mean, cov, s)
-    x_samples = list(samples[:, 0])
-    y_samples = list(samples[:, 1])
-    rank_importance = unique_ranks(importance)
-    probaility_ranked = []
-    for i in (rank_importance):
-        xt = sorted(x_samples)[i]
-        index_x = x_samples.index(xt)
-        yt = y_samples[index_x]
-        index_y = sorted(y_samples).index(yt)
-        probaility_ranked.append(sorted(probabilities)[index_y])
-
-    return probaility_ranked, nodes
+# Partial greedy labelling: stop after this fraction of nodes (None ranks every node)
+# or once the marginal gain drops below GAIN_TOL; unranked nodes share the last rank
+# (the network size), so they stay outside every top-k cut whichever limit stopped the
+# ranking. Keep RANK_FRACTION >= the largest rank_threshold used in 04, so the nodes
+# inside the cut all get a real rank. Both can be set with --rank-fraction / --gain-tol.
+RANK_FRACTION = None
+GAIN_TOL = None
 
 # ========== Characteristics functions ==========
 def weighted_closeness_centrality(G, probabilities):
@@ -301,68 +176,26 @@ def extract_node_features(G, probabilities, node, selected_nodes=None):
     
     return features
 
-# ========== Greedy Selection ==========
-def select_node_outbreak(p, n):
-    return random.choices(n, weights=p, k=1)[0]
-
-def greedy_max_influence(G, node, probabilities, rounds=None, simulations=1000):
-    if rounds is None:
-        rounds = len(G.nodes())
-    degrees = [d for _, d in G.degree()]
-    k_mean = sum(degrees) / len(degrees)
-    k2_mean = sum(d**2 for d in degrees) / len(degrees)
-    best = []
-    available_nodes = set(node)
-    node_rankings = {}
-    
-    for step in range(rounds):
-        if not available_nodes:
-            break
-            
-        candidates = [best + [x] for x in available_nodes]
-        mean_gains = np.zeros(len(candidates))
-        
-        for _ in range(simulations):
-            selected_node = select_node_outbreak(probabilities, node)
-            sim = EoN.Gillespie_SIR(G, tau=3.0/((k2_mean-k_mean)/k_mean), gamma=1., initial_infecteds=selected_node, return_full_data=True)
-            b, c = list(sim.t()), sim.I() + sim.R()
-            
-            for i, candidate in enumerate(candidates):
-                g_max = 0
-                for s in candidate:
-                    m1 = sim.node_history(s)
-                    if len(m1[0]) == 3:
-                        g1 = c[-1] - c[b.index(m1[0][1])]
-                    elif len(m1[0]) == 2:
-                        g1 = c[-1] - c[0]
-                    else:
-                        g1 = 0
-                    g_max = max(g_max, g1)
-                mean_gains[i] += g_max
-        
-        mean_gains /= simulations
-        best = candidates[np.argmax(mean_gains)]
-        
-        selected_node = best[-1]
-        node_rankings[selected_node] = step
-        available_nodes.remove(selected_node)
-    
-    return node_rankings
-
 # ========== Training data generating ==========
-def generate_single_network_data(network_id):
+def sample_network_params(network_id, seed=None, rng=None):
+    # By default the draws come from a local generator on the network's seed, so
+    # costing networks in the parent leaves the global generators alone; it
+    # gives the same values as the global stream right after seed_network.
+    if rng is None:
+        rng = np.random.RandomState(None if seed is None else network_seed(seed, network_id))
+
     # Generating network parameters
-    module_size = np.random.randint(15, 30)
-    number_of_modules = np.random.randint(3, 8)
-    p = np.random.uniform(0.2, 0.9)
-    heterogeneity = np.random.uniform(1, 15)
-    mean_degree = np.random.randint(3, 8)
+    module_size = rng.randint(15, 30)
+    number_of_modules = rng.randint(3, 8)
+    p = rng.uniform(0.2, 0.9)
+    heterogeneity = rng.uniform(1, 15)
+    mean_degree = rng.randint(3, 8)
     
-    alpha = np.random.uniform(0.05, 2.0)
-    beta = np.random.uniform(2, 10)
-    corr = np.random.uniform(-0.9, 0.9)
+    alpha = rng.uniform(0.05, 2.0)
+    beta = rng.uniform(2, 10)
+    corr = rng.uniform(-0.9, 0.9)
     
-    network_params = {
+    return {
         'module_size': module_size,
         'number_of_modules': number_of_modules,
         'p': p,
@@ -372,6 +205,23 @@ def generate_single_network_data(network_id):
         'beta': beta,
         'corr': corr
     }
+
+def generate_single_network_data(network_id, seed=None, rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    sim_rng = None
+    if seed is not None:
+        sim_rng = np.random.default_rng(network_seed(seed, network_id))
+        seed_network(seed, network_id)
+
+    # the network and probability generators continue the same global stream
+    network_params = sample_network_params(network_id, seed, rng=np.random)
+    module_size = network_params['module_size']
+    number_of_modules = network_params['number_of_modules']
+    p = network_params['p']
+    heterogeneity = network_params['heterogeneity']
+    mean_degree = network_params['mean_degree']
+    alpha = network_params['alpha']
+    beta = network_params['beta']
+    corr = network_params['corr']
     
     try:
         ID, edge = network_generator(module_size, number_of_modules, p, heterogeneity, mean_degree)
@@ -392,7 +242,9 @@ def generate_single_network_data(network_id):
         if np.std(probabilities) < 0.005 or np.mean(probabilities) < 0.005:
             return None
         
-        node_rankings = greedy_max_influence(G, nodes, probabilities, rounds=len(G.nodes()), simulations=1000)
+        node_rankings = greedy_max_influence(G, nodes, probabilities, rounds=len(G.nodes()), simulations=1000,
+                                             rng=sim_rng, fraction=rank_fraction, gain_tol=gain_tol)
+        node_rankings = tie_unranked(node_rankings, nodes)
         
         training_samples = []
         nodes_list = list(G.nodes())
@@ -421,38 +273,58 @@ def generate_single_network_data(network_id):
         print(f"Network {network_id} generation failed: {e}")
         return None
 
-def generate_training_dataset(n_networks=100, n_jobs=4, save_path='training_data.csv', batch_size=50):
+def generate_training_dataset(n_networks=100, n_jobs=4, save_path='training_data.csv', batch_size=50,
+                              seed=None, checkpoint_dir=None, rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    # A .parquet save_path is written as a partitioned dataset, one file per network,
+    # and serves as its own checkpoint
+    if save_path.endswith('.parquet'):
+        store = TrainingDatasetWriter(save_path, block_size=batch_size)
+        return generate_training_dataset_checkpointed(n_networks, n_jobs, None, seed, store,
+                                                      rank_fraction, gain_tol)
+
+    # With checkpoint_dir set, finished networks are kept on disk and skipped on restart
+    if checkpoint_dir is not None:
+        return generate_training_dataset_checkpointed(n_networks, n_jobs, save_path, seed,
+                                                      NetworkCheckpoint(checkpoint_dir), rank_fraction, gain_tol)
+
     base_path = save_path.rsplit('.', 1)[0]
     extension = save_path.rsplit('.', 1)[-1]
-    
-    all_samples = []
-    batch_count = 0
-    
-    for i in range(0, n_networks, batch_size):
-        batch_end = min(i + batch_size, n_networks)
-        print(f"Batch {batch_count + 1}: Network {i}-{batch_end-1}")
+    if seed is None:
+        # the cost estimates below need the workers to draw the same parameters
+        seed = random.randrange(2**31)
+        print(f"No seed given, using seed={seed}")
+
+    # One persistent pool, most expensive networks first; a batch file is written
+    # as soon as every network of its id range is done
+    network_ids = list(range(n_networks))
+    costs = [estimate_network_cost(**sample_network_params(network_id, seed)) for network_id in network_ids]
+    tasks = [(network_id, seed, rank_fraction, gain_tol) for network_id in network_ids]
+    results = {}
+    batch_starts = list(range(0, n_networks, batch_size))
+    next_batch = 0
+
+    for network_id, samples in run_largest_first(generate_network_samples, tasks, costs, n_jobs=n_jobs):
+        results[network_id] = samples
+        while next_batch < len(batch_starts):
+            i = batch_starts[next_batch]
+            batch_end = min(i + batch_size, n_networks)
+            if any(network_id not in results for network_id in range(i, batch_end)):
+                break
+            valid_batch_samples = [results[network_id] for network_id in range(i, batch_end)
+                                   if results[network_id] is not None]
+            batch_df = pd.DataFrame([item for sublist in valid_batch_samples for item in sublist])
+            batch_file_path = f"{base_path}_batch_{next_batch + 1}.{extension}"
+
+            if len(batch_df) > 0:
+                batch_df.to_csv(batch_file_path, index=False)
+                print(f"Batch {next_batch + 1} have be saved: {batch_file_path}")
+                print(f"Number of Sampling: {len(batch_df)} | Number of networks: {batch_df['network_id'].nunique()}")
+            else:
+                print(f"Batch {next_batch + 1} has no valid sample")
+            next_batch += 1
+
+    all_samples = [results[network_id] for network_id in network_ids if results[network_id] is not None]
 
-        batch_samples = Parallel(n_jobs=n_jobs)(
-            delayed(generate_single_network_data)(network_id) for network_id in range(i, batch_end)
-        )
-        valid_batch_samples = [s for s in batch_samples if s is not None]
-        all_samples.extend(valid_batch_samples)
-        
-        batch_df = pd.DataFrame([item for sublist in valid_batch_samples for item in sublist])
-        batch_file_path = f"{base_path}_batch_{batch_count + 1}.{extension}"
-        
-        if len(batch_df) > 0:
-            batch_df.to_csv(batch_file_path, index=False)
-            print(f"Batch {batch_count + 1} have be saved: {batch_file_path}")
-            print(f"Number of Sampling: {len(batch_df)} | Number of networks: {batch_df['network_id'].nunique()}")
-        else:
-            print(f"Batch {batch_count + 1} has no valid sample")
-        
-        batch_count += 1
-        
-        if batch_end < n_networks:
-            time.sleep(5)
-    
     # Saved
     if all_samples:
         df = pd.DataFrame([item for sublist in all_samples for item in sublist])
@@ -466,11 +338,102 @@ def generate_training_dataset(n_networks=100, n_jobs=4, save_path='training_data
         print("No data!")
         return None
 
+def generate_network_samples(network_id, seed=None, rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    return network_id, generate_single_network_data(network_id, seed, rank_fraction, gain_tol)
+
+def checkpoint_single_network(network_id, store, seed=None, rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    samples = generate_single_network_data(network_id, seed, rank_fraction, gain_tol)
+    store.save(network_id, samples)
+    return network_id, len(samples) if samples else 0
+
+def generate_training_dataset_checkpointed(n_networks, n_jobs, save_path, seed, store,
+                                           rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    # Every finished network is written to the store (NetworkCheckpoint or TrainingDatasetWriter)
+    # by its worker, so an interrupted run only loses the networks that were still in flight.
+    if seed is None:
+        # the cost estimates below need the workers to draw the same parameters
+        seed = random.randrange(2**31)
+        print(f"No seed given, using seed={seed} (pass it to resume this run)")
+
+    completed = store.completed()
+    pending = [network_id for network_id in range(n_networks) if network_id not in completed]
+    print(f"{type(store).__name__}: {n_networks - len(pending)} networks done, {len(pending)} pending")
+
+    # One persistent pool, most expensive networks first, results taken in completion order
+    costs = [estimate_network_cost(**sample_network_params(network_id, seed)) for network_id in pending]
+    tasks = [(network_id, store, seed, rank_fraction, gain_tol) for network_id in pending]
+    n_rows_total = 0
+    for n_done, (network_id, n_rows) in enumerate(
+            run_largest_first(checkpoint_single_network, tasks, costs, n_jobs=n_jobs), 1):
+        n_rows_total += n_rows
+        print(f"Network {network_id} done ({n_done}/{len(pending)}) | Number of Sampling: {n_rows_total}")
+
+    if save_path is None:
+        print(f"All data saved to {store.root}")
+        return store.root
+
+    # Assemble in network_id order so a resumed run matches an uninterrupted one
+    df = store.load(range(n_networks))
+    if df is None:
+        print("No data!")
+        return None
+
+    df.to_csv(save_path, index=False)
+    print(f"All data saved to {save_path}")
+    return df
+
+# ========== Multi-machine mode (shared job table) ==========
+def create_training_jobs(job_db, n_networks, seed, store):
+    # run once: one row per network, costed so workers claim the largest first
+    table = JobTable(job_db)
+    network_ids = list(range(n_networks))
+    costs = [estimate_network_cost(**sample_network_params(network_id, seed)) for network_id in network_ids]
+    table.add(network_ids, costs)
+    table.mark_done(store.completed())
+    print(f"Job table {job_db}: {table.counts()}")
+    return table
+
+def drain_training_jobs(job_db, store, seed, poll_seconds=60, rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    def run(network_id):
+        return checkpoint_single_network(network_id, store, seed, rank_fraction, gain_tol)[1]
+    return drain(JobTable(job_db), run, poll_seconds=poll_seconds)
+
+def run_training_worker(job_db, store, seed, n_jobs=4, rank_fraction=RANK_FRACTION, gain_tol=GAIN_TOL):
+    # n_jobs independent claimers on this host; start the same call on every machine
+    # (with the same --rank-fraction / --gain-tol, or the labels of the hosts differ)
+    done = Parallel(n_jobs=n_jobs)(
+        delayed(drain_training_jobs)(job_db, store, seed, rank_fraction=rank_fraction, gain_tol=gain_tol)
+        for _ in range(n_jobs)
+    )
+    print(f"This host completed {sum(len(d) for d in done)} networks | Job table: {JobTable(job_db).counts()}")
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', help="shared SQLite job table; runs this host as a worker")
+    parser.add_argument('--create-jobs', action='store_true', help="fill the job table before working")
+    parser.add_argument('--rank-fraction', type=float, default=RANK_FRACTION,
+                        help="rank only this fraction of each network's nodes")
+    parser.add_argument('--gain-tol', type=float, default=GAIN_TOL,
+                        help="stop ranking once a pick adds less than this to the objective")
+    args = parser.parse_args()
+
     random.seed(42)
-    training_data = generate_training_dataset(
-        n_networks=1000,
-        n_jobs=max(1, multiprocessing.cpu_count() - 2),
-        save_path='D:\\data_generating\\training_data.csv',
-        batch_size=50
-    )
\ No newline at end of file
+    save_path = 'D:\\data_generating\\training_data.parquet'
+    n_jobs = max(1, multiprocessing.cpu_count() - 2)
+    if args.jobs:
+        store = TrainingDatasetWriter(save_path, block_size=50)
+        if args.create_jobs:
+            create_training_jobs(args.jobs, 1000, 42, store)
+        run_training_worker(args.jobs, store, 42, n_jobs=n_jobs,
+                            rank_fraction=args.rank_fraction, gain_tol=args.gain_tol)
+    else:
+        training_data = generate_training_dataset(
+            n_networks=1000,
+            n_jobs=n_jobs,
+            save_path=save_path,
+            batch_size=50,
+            seed=42,
+            rank_fraction=args.rank_fraction,
+            gain_tol=args.gain_tol
+        )
\ No newline at end of file
@@ -3,35 +3,9 @@ import random
 import networkx as nx
 import EoN
 from collections import defaultdict
+from eidopt import probability_generate
+from eidopt.graphcache import load_gml
 
-# Emergence probability generation and assignment
-def unique_ranks(data):
-    indexed_data = [(value, index) for index, value in enumerate(data)]
-    sorted_data = sorted(indexed_data, key=lambda x: x[0])
-    ranks = [0] * len(data)
-    for rank, (_, original_index) in enumerate(sorted_data):
-        ranks[original_index] = rank
-    return ranks
-
-
-def probability_generate(G, alpha, beta, corr, s):
-    probabilities = list(np.random.beta(alpha, beta, s))
-    importance = [t[1] for t in nx.algorithms.centrality.degree_centrality(G).items()]
-    nodes = list(G.nodes)
-    mean = [0, 0]
-    cov = [[1, corr], [corr, 1]]
-    samples = np.random.multivariate_normal(mean, cov, s)
-    x_samples = list(samples[:, 0])
-    y_samples = list(samples[:, 1])
-    rank_importance = unique_ranks(importance)
-    probability_ranked = []
-    for i in rank_importance:
-        xt = sorted(x_samples)[i]
-        index_x = x_samples.index(xt)
-        yt = y_samples[index_x]
-        index_y = sorted(y_samples).index(yt)
-        probability_ranked.append(sorted(probabilities)[index_y])
-    return probability_ranked, nodes
 
 # Genetic algorithm
 class GeneticAlgorithmNodeSelection:
@@ -252,10 +226,8 @@ class GeneticAlgorithmNodeSelection:
 
 
 def load_network_and_run_ga(gml_file_path, probabilities_data, l, **kwargs):
-    G = nx.read_gml(gml_file)
-    connected_components = list(nx.connected_components(G))
-    largest_cc = max(connected_components, key=len)
-    G = G.subgraph(largest_cc)
+    # largest connected component, from the binary cache after the first parse
+    G = load_gml(gml_file_path)
     node_list = list(G.nodes())
 
     if isinstance(probabilities_data, str):
@@ -306,10 +278,7 @@ if __name__ == "__main__":
     ]
     for gml_file in network_files:
         print(f"\nProcessing network: {gml_file}")  
-        G = nx.read_gml(gml_file)
-        connected_components = list(nx.connected_components(G))
-        largest_cc = max(connected_components, key=len)
-        G = G.subgraph(largest_cc)
+        G = load_gml(gml_file)
 
         probabilities, nodes = probability_generate(G, 0.1, 5, -0.7, len(G.nodes()))
         l = 6
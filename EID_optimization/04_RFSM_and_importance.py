@@ -1,74 +1,50 @@
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import GroupShuffleSplit, GroupKFold
-from sklearn.ensemble import RandomForestRegressor
-from skopt import BayesSearchCV
 from sklearn.inspection import permutation_importance, PartialDependenceDisplay
-from sklearn.metrics import ndcg_score, make_scorer
+from sklearn.metrics import ndcg_score
 from scipy.stats import spearmanr, kendalltau
 import joblib
 import math
 import os
 import matplotlib.pyplot as plt
+from eidopt.dataset import load_training_data
+from eidopt.forest import export_forest
+from eidopt.scoring import GroupedNDCGScorer
+from eidopt.training import (SURROGATE_RESOURCE, SuccessiveHalvingSearch, WarmStartBayesSearchCV,
+                             group_split, make_surrogate)
 
 rank_thresholds = [0.1, 0.2, 0.3]
-
-for rank_threshold in rank_thresholds:
-    base_dir = rf"D:\data_generating\performance_{rank_threshold}"
-    os.makedirs(base_dir, exist_ok=True)
-    def ndcg_grouped_score(y_true, y_pred, groups=None, **kwargs):
-        df_temp = pd.DataFrame({
-            'y_true': y_true,
-            'y_pred': y_pred,
-            'group': groups
-        })
-
-        ndcgs = []
-        for gid, g in df_temp.groupby('group'):
-            n = len(g)
-            if n == 0:
-                continue
-            k = max(1, int(rank_threshold * n))
-            ndcg_val = ndcg_score(
-                [g['y_true'].values],
-                [g['y_pred'].values],
-                k=k
-            )
-            ndcgs.append(ndcg_val)
-
-        return np.mean(ndcgs) if ndcgs else 0.0
-
-    ndcg_scorer = make_scorer(ndcg_grouped_score, greater_is_better=True)
-
-    file_path = r"D:\data_generating\training_data_1000.csv"
-    df = pd.read_csv(file_path)
-    df_below = df[df['rank'] <= rank_threshold].copy()
-    df_above = df[df['rank'] > rank_threshold].copy()
-
-    if len(df_above) > 0:
-        df_above_sampled = df_above.sample(frac=1, random_state=42).copy()
-        df_above_sampled['rank'] = rank_threshold
-    else:
-        df_above_sampled = df_above.copy()
-
-    df_aug = pd.concat([df_below, df_above_sampled], ignore_index=True)
-
-    feature_cols = [c for c in df_aug.columns
-                    if c not in {'ranking', 'rank', 'node_id', 'network_id', 'num_nodes'}]
-    X = df_aug[feature_cols]
-    y_rank = df_aug['rank']
-    groups = df_aug['network_id']
-
-    gss = GroupShuffleSplit(n_splits=1, test_size=0.3, random_state=42)
-    train_idx, test_idx = next(gss.split(X, y_rank, groups=groups))
-    df_aug['split'] = 'none'
-    df_aug.loc[train_idx, 'split'] = 'train'
-    df_aug.loc[test_idx, 'split'] = 'test'
-
-    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-    y_train, y_test = y_rank.iloc[train_idx], y_rank.iloc[test_idx]
-    groups_train = groups.iloc[train_idx]
-    cv_splitter = GroupKFold(n_splits=5)
+# Bayesian iterations for the first threshold; later thresholds start from
+# the previous optimum and need fewer new points
+n_iter_first = 30
+n_iter_warm = 10
+# 'bayes' (BayesSearchCV), or multi-fidelity 'halving' / 'hyperband' that
+# prune configurations on few trees and few networks before full fits
+search_mode = 'bayes'
+# 'rf' (RandomForestRegressor) or 'hgb' (HistGradientBoostingRegressor, binned
+# features: much faster to train and far smaller, usually slightly less accurate)
+surrogate = 'rf'
+
+# Load and type the dataset once; every threshold shares the same rows,
+# network split and CV folds and only differs in how 'rank' is clipped.
+# 02's partitioned Parquet dataset (a CSV export loads the same way)
+file_path = r"D:\data_generating\training_data.parquet"
+df = load_training_data(file_path, exclude=['node_id'])
+if 'rank' not in df.columns:
+    # 02 stores the greedy step; the thresholds below are fractions of the network
+    df['rank'] = df['ranking'] / df.groupby('network_id')['ranking'].transform('size')
+feature_cols = [c for c in df.columns
+                if c not in {'ranking', 'rank', 'node_id', 'network_id', 'num_nodes'}]
+X = df[feature_cols]
+groups = df['network_id']
+
+train_idx, test_idx, cv_folds = group_split(groups, test_size=0.3, random_state=42, n_folds=5)
+split = np.full(len(df), 'none', dtype=object)
+split[train_idx] = 'train'
+split[test_idx] = 'test'
+X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+
+if surrogate == 'rf':
     search_spaces = {
         'n_estimators': (100, 500),
         'max_depth': (5, 30),
@@ -77,22 +53,67 @@ for rank_threshold in rank_thresholds:
         'max_features': (0.3, 1.0),
         'max_samples': (0.5, 1.0)
     }
-    base_rf = RandomForestRegressor(oob_score=False, n_jobs=-1, random_state=42)
-    bayes_cv = BayesSearchCV(
-        base_rf,
-        search_spaces,
-        n_iter=30,
-        cv=cv_splitter,
-        scoring=ndcg_scorer,
-        n_jobs=-1,
-        random_state=42,
-        verbose=1
-    )
-    bayes_cv.fit(X_train, y_train, groups=groups_train)
-    best_rf = bayes_cv.best_estimator_
+else:
+    search_spaces = {
+        'max_iter': (100, 500),
+        'learning_rate': (0.01, 0.3, 'log-uniform'),
+        'max_leaf_nodes': (15, 127),
+        'min_samples_leaf': (5, 50),
+        'l2_regularization': (1e-6, 10.0, 'log-uniform'),
+        'max_features': (0.3, 1.0)
+    }
+warm_params = None
 
-    best_rf.fit(X_train, y_train)
-    df_aug['pred_rank'] = best_rf.predict(X)
+for rank_threshold in rank_thresholds:
+    base_dir = rf"D:\data_generating\performance_{rank_threshold}"
+    os.makedirs(base_dir, exist_ok=True)
+
+    # ranks above the threshold are tied at the threshold
+    y_rank = df['rank'].clip(upper=rank_threshold)
+    y_train, y_test = y_rank.iloc[train_idx], y_rank.iloc[test_idx]
+    ndcg_scorer = GroupedNDCGScorer(groups, k_fraction=rank_threshold)
+
+    if search_mode == 'bayes':
+        search = WarmStartBayesSearchCV(
+            make_surrogate(surrogate, n_jobs=-1, random_state=42),
+            search_spaces,
+            warm_start_params=None if warm_params is None else [warm_params],
+            n_iter=n_iter_first if warm_params is None else n_iter_warm,
+            cv=cv_folds,
+            scoring=ndcg_scorer,
+            n_jobs=-1,
+            random_state=42,
+            verbose=1
+        )
+        search.fit(X_train, y_train)
+    else:
+        # the search parallelises over candidates x folds, so each forest is single-threaded
+        search = SuccessiveHalvingSearch(
+            make_surrogate(surrogate, n_jobs=1, random_state=42),
+            search_spaces,
+            scoring=ndcg_scorer,
+            hyperband=(search_mode == 'hyperband'),
+            cv=cv_folds,
+            warm_start_params=None if warm_params is None else [warm_params],
+            n_jobs=-1,
+            random_state=42,
+            verbose=1,
+            resource_param=SURROGATE_RESOURCE[surrogate]
+        )
+        # the folds are the shared ones; groups only pick each rung's networks
+        search.fit(X_train, y_train, groups=groups.iloc[train_idx])
+    # refit=True already fitted the best configuration on the whole train part
+    best_rf = search.best_estimator_
+    if surrogate == 'rf':
+        best_rf.set_params(n_jobs=-1)
+    warm_params = dict(search.best_params_)
+
+    df_eval = pd.DataFrame({
+        'network_id': groups,
+        'rank': y_rank,
+        'pred_rank': best_rf.predict(X),
+        'split': split
+    })
 
     def calc_grouped_metrics(df_eval):
         results = []
@@ -108,8 +129,8 @@ for rank_threshold in rank_thresholds:
             results.append((rho, tau, ndcg_val))
         return pd.DataFrame(results, columns=['Spearman', 'Kendall', 'NDCG']).mean().to_dict()
 
-    train_metrics = calc_grouped_metrics(df_aug[df_aug['split'] == 'train'])
-    test_metrics = calc_grouped_metrics(df_aug[df_aug['split'] == 'test'])
+    train_metrics = calc_grouped_metrics(df_eval[df_eval['split'] == 'train'])
+    test_metrics = calc_grouped_metrics(df_eval[df_eval['split'] == 'test'])
 
     print("\nTraining set metrics:", train_metrics)
     print("Test set metrics:", test_metrics)
@@ -126,5 +147,8 @@ for rank_threshold in rank_thresholds:
 
     perm_path = os.path.join(base_dir, 'perm_importance_bayes.csv')
     perm_df.to_csv(perm_path, index=False)
-    model_path = os.path.join(base_dir, 'rank_rf_bayes.pkl')
-    joblib.dump(best_rf, model_path)
\ No newline at end of file
+    model_path = os.path.join(base_dir, f'rank_{surrogate}_bayes.pkl')
+    joblib.dump(best_rf, model_path)
+    # flat-array copy that evaluation workers can memory-map (eidopt.forest.CompactForest)
+    if surrogate == 'rf':
+        export_forest(best_rf, os.path.join(base_dir, 'rank_rf_compact'))
\ No newline at end of file
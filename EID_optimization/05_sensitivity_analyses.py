@@ -2,12 +2,16 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import ndcg_score, make_scorer
-from sklearn.inspection import permutation_importance
+from sklearn.metrics import ndcg_score
 from skopt import BayesSearchCV
 from skopt.space import Integer, Real
 import os
 import glob
+from eidopt.dataset import dataset_columns, load_training_data
+from eidopt.importance import permutation_importance_batched
+from eidopt.scheduler import run_largest_first
+from eidopt.scoring import GroupedNDCGScorer
+from eidopt.training import SURROGATE_RESOURCE, SuccessiveHalvingSearch, group_split, make_surrogate
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,235 +26,332 @@ def define_feature_categories():
     }
     return categories
 
-def ndcg_grouped_score(y_true, y_pred, groups=None, **kwargs):
-        df_temp = pd.DataFrame({
-            'y_true': y_true,
-            'y_pred': y_pred,
-            'group': groups
-        })
-
-        ndcgs = []
-        for gid, g in df_temp.groupby('group'):
-            n = len(g)
-            if n == 0:
-                continue
-            k = max(1, int(0.3 * n))  # top 30%
-            ndcg_val = ndcg_score(
-                [g['y_true'].values],
-                [g['y_pred'].values],
-                k=k
-            )
-            ndcgs.append(ndcg_val)
-
-        return np.mean(ndcgs) if ndcgs else 0.0
-
-ndcg_scorer = make_scorer(ndcg_grouped_score, greater_is_better=True)
-
-def get_relevant_columns(df):
+def get_relevant_columns(columns):
     categories = define_feature_categories()
     
     all_features = []
     for features in categories.values():
         all_features.extend(features)
     
-    relevant_cols = ['rank'] + all_features
+    # network_id is only kept to group rows for the NDCG scorer
+    relevant_cols = ['ranking', 'network_id'] + all_features
     
-    available_cols = [col for col in relevant_cols if col in df.columns]
+    available_cols = [col for col in relevant_cols if col in columns]
     
     return available_cols
 
-def calculate_permutation_importance(model, X, y, n_repeats=100, random_state=42):
-    perm_importance = permutation_importance(
-        model, X, y, 
-        n_repeats=n_repeats, 
+def calculate_permutation_importance(model, X, y, n_repeats=100, random_state=42, n_jobs=-1):
+    _, importances = permutation_importance_batched(
+        model, X, y,
+        {f: [f] for f in X.columns},
+        n_repeats=n_repeats,
         random_state=random_state,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
     
     perm_importance_df = pd.DataFrame({
         'feature': X.columns,
-        'permutation_importance': perm_importance.importances_mean,
-        'std': perm_importance.importances_std
+        'permutation_importance': [importances[f].mean() for f in X.columns],
+        'std': [importances[f].std() for f in X.columns]
     }).sort_values('permutation_importance', ascending=False)
     
     return perm_importance_df
 
-def calculate_group_permutation_importance(model, X, y, categories, metric=ndcg_score, n_repeats=100, random_state=42):
-    rng = np.random.RandomState(random_state)
+def ndcg_single_ranking(y_true, y_pred):
+    # all rows ranked as one list
+    return ndcg_score(np.asarray(y_true)[None], np.asarray(y_pred)[None])
+
+def calculate_group_permutation_importance(model, X, y, categories, metric=ndcg_single_ranking, n_repeats=100, random_state=42, n_jobs=-1):
+    available = {category: [f for f in features if f in X.columns] for category, features in categories.items()}
     
-    baseline_score = metric(y, model.predict(X))
+    _, importances = permutation_importance_batched(
+        model, X, y,
+        {category: features for category, features in available.items() if features},
+        metric=metric,
+        n_repeats=n_repeats,
+        random_state=random_state,
+        n_jobs=n_jobs
+    )
     
     category_importance = {}
-    
-    for category, features in categories.items():
-        available_features = [f for f in features if f in X.columns]
-        if not available_features:
-            category_importance[category] = {
-                'importance_mean': 0.0,
-                'importance_std': 0.0,
-                'features': []
-            }
-            continue
-        
-        scores = []
-        for _ in range(n_repeats):
-            X_permuted = X.copy()
-            for f in available_features:
-                X_permuted[f] = rng.permutation(X_permuted[f].values)
-            
-            perm_score = metric(y, model.predict(X_permuted))
-            scores.append(baseline_score - perm_score)
-        
+    for category, features in available.items():
+        scores = importances.get(category)
         category_importance[category] = {
-            'importance_mean': np.mean(scores),
-            'importance_std': np.std(scores),
-            'features': available_features
+            'importance_mean': np.mean(scores) if scores is not None else 0.0,
+            'importance_std': np.std(scores) if scores is not None else 0.0,
+            'features': features
         }
     
     return category_importance
 
 # Rank_Permutation Importance
-def calculate_rank_specific_importance(df, X_cols, y_col='ranking', n_ranks=8, n_repeats=10):
+def rank_importance_tables(features, importances, categories):
+    perm_df = pd.DataFrame({
+        'feature': features,
+        'importance': importances
+    })
+
+    # Normalize importance
+    total_importance = perm_df['importance'].sum()
+    if total_importance > 0:
+        perm_df['importance_norm'] = perm_df['importance'] / total_importance
+    else:
+        perm_df['importance_norm'] = 0.0
+
+    # grouped importance
+    category_importance = {}
+    for category, category_features in categories.items():
+        category_features = [f for f in category_features if f in perm_df['feature'].values]
+        if category_features:
+            cat_score = perm_df[perm_df['feature'].isin(category_features)]['importance_norm'].sum()
+            category_importance[category] = cat_score
+        else:
+            category_importance[category] = 0.0
+
+    return perm_df[['feature', 'importance', 'importance_norm']], category_importance
+
+def fit_rank_importance(X_sorted, ranking_sorted, n_rows, n_features, rank, n_repeats, n_threads):
+    # rows are sorted by ranking, so the candidates at this rank are a prefix (a view, no copy)
+    X_rank = X_sorted[:n_rows, :n_features]
+    y_rank = (ranking_sorted[:n_rows] == rank).astype(np.float32)
+    if n_rows == 0 or y_rank.sum() == 0:
+        return rank, np.zeros(n_features)
+
+    # rank-specific random forest model
+    rf = RandomForestRegressor(
+        n_estimators=150, 
+        random_state=42, 
+        n_jobs=n_threads
+    )
+    rf.fit(X_rank, y_rank)
+
+    # Calculate Permutation Importance
+    _, importances = permutation_importance_batched(
+        rf, X_rank, y_rank,
+        {i: [i] for i in range(n_features)},
+        n_repeats=n_repeats,
+        random_state=42
+    )
+    return rank, np.array([importances[i].mean() for i in range(n_features)])
+
+def rank_r2(n_rows):
+    # per-rank R^2 of a multi-output model, rank r scored on its own candidates only
+    def score(Y, P):
+        out = np.zeros(len(n_rows))
+        for rank, n in enumerate(n_rows):
+            y = Y[:n, rank]
+            total = np.sum((y - y.mean()) ** 2) if n else 0.0
+            if total > 0:
+                out[rank] = 1 - np.sum((y - P[:n, rank]) ** 2) / total
+        return out
+    return score
+
+def calculate_rank_specific_importance(df, X_cols, y_col='ranking', n_ranks=8, n_repeats=10,
+                                       n_jobs=-1, threads_per_task=1, multi_output=False):
+    """Per-rank importance of the features for "is selected at step `rank`".
+
+    The data are sorted once by ranking (descending), so the rows still
+    available at rank r are a prefix of one float32 array. Ranks are fitted
+    as independent tasks on threads, the largest subset first, with
+    `threads_per_task` threads per forest and `n_jobs` cores in total.
+    `multi_output=True` instead fits one forest with one output per rank
+    from 1 on, trained on the rows available at rank 1, and scores output r
+    on the rows available at rank r. Output r therefore also learns from
+    rows that the per-rank forest for r >= 2 never sees, so those
+    importances are not comparable with the default path; both tables carry
+    a 'model' column ('per_rank' or 'multi_output') saying which fit they
+    come from. Rank 0 is still fitted on its own on the static columns.
+    """
+    from joblib import effective_n_jobs
+    
+    X_cols = list(X_cols)
     rank_importance_dict = {}
     rank_category_importance_dict = {}
     categories = define_feature_categories()
 
     dynamic_features = categories['Selection Dynamics']
+    # dynamic features last, so rank 0 (which may not see them) uses a column prefix too
+    static_cols = [f for f in X_cols if f not in dynamic_features and f in df.columns]
+    all_cols = static_cols + [f for f in X_cols if f in dynamic_features and f in df.columns]
 
-    for rank in range(n_ranks):
-        df_rank = df[df[y_col] >= rank].copy()
-        y_rank = (df_rank[y_col] == rank).astype(int)
+    ranking = df[y_col].to_numpy()
+    order = np.argsort(-ranking, kind='stable')
+    ranking_sorted = ranking[order]
+    X_sorted = np.ascontiguousarray(df[all_cols].to_numpy(dtype=np.float32)[order])
+    n_rows = [int(np.searchsorted(-ranking_sorted, -rank, side='right')) for rank in range(n_ranks)]
+    n_features = [len(static_cols)] + [len(all_cols)] * (n_ranks - 1)
+    n_cores = effective_n_jobs(n_jobs)
 
-        if rank == 0:
-            allowed_features = [f for f in X_cols if f not in dynamic_features and f in df_rank.columns]
-        else:
-            allowed_features = [f for f in X_cols if f in df_rank.columns]
-
-        X_rank = df_rank[allowed_features]
-
-        if len(X_rank) == 0 or y_rank.sum() == 0:
-            empty_df = pd.DataFrame({
-                'feature': allowed_features,
-                'importance': [0.0] * len(allowed_features),
-                'importance_norm': [0.0] * len(allowed_features)
-            })
-            rank_importance_dict[rank] = empty_df
-            category_importance = {category: 0.0 for category in categories.keys()}
-            rank_category_importance_dict[rank] = category_importance
-            continue
+    if multi_output:
+        # rank 0 may not see the dynamic features, so it keeps its own static-only forest
+        results = [fit_rank_importance(X_sorted, ranking_sorted, n_rows[0], n_features[0], 0,
+                                       n_repeats, n_cores)]
+        if n_ranks > 1:
+            # rows already selected before rank 1 are outside every per-rank model
+            X_multi = X_sorted[:n_rows[1]]
+            Y = (ranking_sorted[:n_rows[1], None] == np.arange(1, n_ranks)).astype(np.float32)
+            rf = RandomForestRegressor(n_estimators=150, random_state=42, n_jobs=n_cores)
+            rf.fit(X_multi, Y)
+            _, importances = permutation_importance_batched(
+                rf, X_multi, Y,
+                {i: [i] for i in range(len(all_cols))},
+                metric=rank_r2(n_rows[1:]),
+                n_repeats=n_repeats,
+                random_state=42
+            )
+            results += [(rank, np.array([importances[i][:, rank - 1].mean() for i in range(n_features[rank])]))
+                        for rank in range(1, n_ranks)]
+    else:
+        n_threads = max(1, min(threads_per_task, n_cores))
+        tasks = [(X_sorted, ranking_sorted, n_rows[rank], n_features[rank], rank, n_repeats, n_threads)
+                 for rank in range(n_ranks)]
+        results = run_largest_first(fit_rank_importance, tasks, n_rows,
+                                    n_jobs=max(1, n_cores // n_threads), prefer='threads')
 
-        # rank-specific random forest model
-        rf = RandomForestRegressor(
-            n_estimators=150, 
-            random_state=42, 
-            n_jobs=-1
-        )
-        rf.fit(X_rank, y_rank)
-
-        # Calculate Permutation Importance
-        perm_result = permutation_importance(
-            rf, X_rank, y_rank,
-            n_repeats=n_repeats,
-            n_jobs=-1,
-            random_state=42
-        )
+    for rank, importances in results:
+        # report features in X_cols order, as before the reordering
+        keep = sorted(range(n_features[rank]), key=lambda i: X_cols.index(all_cols[i]))
+        features = [all_cols[i] for i in keep]
+        importances = importances[keep]
+        perm_df, category_importance = rank_importance_tables(features, importances, categories)
+        model = 'multi_output' if multi_output and rank > 0 else 'per_rank'
+        perm_df['model'] = model
+        category_importance['model'] = model
+        rank_importance_dict[rank], rank_category_importance_dict[rank] = perm_df, category_importance
 
-        perm_df = pd.DataFrame({
-            'feature': allowed_features,
-            'importance': perm_result.importances_mean
-        })
+    # keep rank order (tasks finish in any order)
+    rank_importance_dict = {rank: rank_importance_dict[rank] for rank in range(n_ranks)}
+    rank_category_importance_dict = {rank: rank_category_importance_dict[rank] for rank in range(n_ranks)}
+    return rank_importance_dict, rank_category_importance_dict
 
-        # Normalize importance
-        total_importance = perm_df['importance'].sum()
-        if total_importance > 0:
-            perm_df['importance_norm'] = perm_df['importance'] / total_importance
-        else:
-            perm_df['importance_norm'] = 0.0
-            
-        rank_importance_dict[rank] = perm_df[['feature', 'importance', 'importance_norm']]
-
-        # grouped importance
-        category_importance = {}
-        for category, features in categories.items():
-            category_features = [f for f in features if f in perm_df['feature'].values]
-            if category_features:
-                cat_score = perm_df[perm_df['feature'].isin(category_features)]['importance_norm'].sum()
-                category_importance[category] = cat_score
-            else:
-                category_importance[category] = 0.0
-        rank_category_importance_dict[rank] = category_importance
+# Bayesian Optimization for the surrogate
+# search='halving' / 'hyperband' prunes configurations on few trees and networks first;
+# backend='hgb' swaps the random forest for HistGradientBoostingRegressor
+def train_optimized_model(X_train, y_train, groups_train=None, search='bayes', n_jobs=4, backend='rf', cv=5):
 
-    return rank_importance_dict, rank_category_importance_dict
+    if backend == 'rf':
+        search_spaces = {
+            'n_estimators': Integer(100, 200),
+            'max_depth': Integer(8, 15),
+            'min_samples_split': Integer(5, 15),
+            'min_samples_leaf': Integer(3, 10),
+            'max_features': Real(0.4, 0.8),
+            'max_samples': Real(0.6, 0.9),
+        }
+    else:
+        search_spaces = {
+            'max_iter': Integer(100, 300),
+            'learning_rate': Real(0.02, 0.3, prior='log-uniform'),
+            'max_leaf_nodes': Integer(15, 63),
+            'min_samples_leaf': Integer(10, 50),
+            'l2_regularization': Real(1e-6, 10.0, prior='log-uniform'),
+            'max_features': Real(0.4, 0.8),
+        }
+    scorer = GroupedNDCGScorer(groups_train, k_fraction=0.3)
 
-# Bayesian Optimization for Random Forest
-def train_optimized_model(X_train, y_train):
+    if search == 'bayes':
+        # the 5 folds of a candidate run in parallel, spare cores go to the forests
+        search_jobs = min(n_jobs, 5)
+        model = make_surrogate(backend, n_jobs=max(1, n_jobs // search_jobs), random_state=42)
 
-    search_spaces = {
-        'n_estimators': Integer(100, 200),
-        'max_depth': Integer(8, 15),
-        'min_samples_split': Integer(5, 15),
-        'min_samples_leaf': Integer(3, 10),
-        'max_features': Real(0.4, 0.8),
-        'max_samples': Real(0.6, 0.9),
-    }
-    
-    rf = RandomForestRegressor(random_state=42, n_jobs=4)
-    
-    bayes_search = BayesSearchCV(
-        estimator=rf,
-        search_spaces=search_spaces,
-        n_iter=30,
-        scoring=ndcg_scorer,
-        n_jobs=4,
-        cv=5,
-        random_state=42,
-        verbose=0
-    )
-    
-    bayes_search.fit(X_train, y_train)
-    best_params = bayes_search.best_params_
+        bayes_search = BayesSearchCV(
+            estimator=model,
+            search_spaces=search_spaces,
+            n_iter=30,
+            scoring=scorer,
+            n_jobs=search_jobs,
+            cv=cv,
+            random_state=42,
+            verbose=0
+        )
 
-    final_model = RandomForestRegressor(**best_params, random_state=42, n_jobs=-1)
+        bayes_search.fit(X_train, y_train)
+        best_params = bayes_search.best_params_
+    else:
+        halving_search = SuccessiveHalvingSearch(
+            make_surrogate(backend, n_jobs=1, random_state=42),
+            search_spaces,
+            scoring=scorer,
+            hyperband=(search == 'hyperband'),
+            cv=5,
+            n_jobs=n_jobs,
+            random_state=42,
+            refit=False,
+            resource_param=SURROGATE_RESOURCE[backend]
+        )
+        halving_search.fit(X_train, y_train, groups=groups_train)
+        best_params = halving_search.best_params_
+
+    final_model = make_surrogate(backend, n_jobs=n_jobs, random_state=42, **best_params)
     
     return final_model, best_params
 
-def process_single_file(file_path, output_dir):
+def output_paths(file_name, output_dir):
+    return {
+        'feature': os.path.join(output_dir, f"{file_name}_feature_importance.csv"),
+        'category': os.path.join(output_dir, f"{file_name}_category_importance.csv"),
+        'rank_feature': os.path.join(output_dir, f"{file_name}_rank_feature_importance.csv"),
+        'rank_category': os.path.join(output_dir, f"{file_name}_rank_category_importance.csv"),
+    }
+
+def write_csv_atomic(df, path, **kwargs):
+    # a crashed or killed run never leaves a truncated CSV under the final name
+    tmp = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    df.to_csv(tmp, **kwargs)
+    os.replace(tmp, path)
+
+def process_single_file(file_path, output_dir, search='bayes', n_jobs=4, backend='rf'):
 
     file_name = os.path.splitext(os.path.basename(file_path))[0]
+    paths = output_paths(file_name, output_dir)
     
     try:
-        df = pd.read_csv(file_path)
-        relevant_cols = get_relevant_columns(df)
-        df_filtered = df[relevant_cols].copy()
+        relevant_cols = get_relevant_columns(dataset_columns(file_path))
+        df_filtered = load_training_data(file_path, columns=relevant_cols)
         if 'ranking' not in df_filtered.columns:
             print(f" Warning: the file {file_name} does not contain 'ranking' column, skipping...")
-            return
-        X = df_filtered.drop(['ranking'], axis=1)
+            return 'skipped'
+        X = df_filtered.drop(['ranking', 'network_id'], axis=1, errors='ignore')
         y = df_filtered['ranking']
+        groups = df_filtered['network_id'] if 'network_id' in df_filtered.columns else None
         
         if X.empty:
             print(f"  Warning: the file {file_name} has no valid features after filtering, skipping...")
-            return
+            return 'skipped'
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.3, random_state=42
-        )
-        final_model, best_params = train_optimized_model(X_train, y_train)
+        if groups is not None:
+            # split and tune by network, as 04 does, so no network is on both sides
+            train_idx, test_idx, folds = group_split(groups, test_size=0.3, random_state=42, n_folds=5)
+            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+            y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+            groups_train = groups.iloc[train_idx]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.3, random_state=42
+            )
+            groups_train, folds = None, 5
+        final_model, best_params = train_optimized_model(X_train, y_train, groups_train, search=search,
+                                                         n_jobs=n_jobs, backend=backend, cv=folds)
         final_model.fit(X, y)
         
         # 1. Calculate permutation importance
         perm_importance_df = calculate_permutation_importance(
-            final_model, X_test, y_test, n_repeats=50, random_state=42
+            final_model, X_test, y_test, n_repeats=50, random_state=42, n_jobs=n_jobs
         )
-        perm_output_path = os.path.join(output_dir, f"{file_name}_feature_importance.csv")
-        perm_importance_df.to_csv(perm_output_path, index=False)
+        write_csv_atomic(perm_importance_df, paths['feature'], index=False)
         
         # 2. Calculate overall model category importance
         categories = define_feature_categories()
+        if groups is not None:
+            # mean NDCG@30% over the test networks, like the tuning scorer
+            layout = GroupedNDCGScorer(groups.loc[X_test.index], k_fraction=0.3).layout(X_test, y_test)
+            metric = lambda y_true, y_pred: layout.ndcg(y_pred).mean()
+        else:
+            metric = ndcg_single_ranking
         category_importance = calculate_group_permutation_importance(
             final_model, X_test, y_test, 
-            categories=categories,
-            n_repeats=50, random_state=42
+            categories=categories, metric=metric,
+            n_repeats=50, random_state=42, n_jobs=n_jobs
         )
         
         category_df = pd.DataFrame([
@@ -263,12 +364,11 @@ def process_single_file(file_path, output_dir):
             for category, data in category_importance.items()
         ]).sort_values('importance_mean', ascending=False)
         
-        category_output_path = os.path.join(output_dir, f"{file_name}_category_importance.csv")
-        category_df.to_csv(category_output_path, index=False)
+        write_csv_atomic(category_df, paths['category'], index=False)
         
         # 3. Calculate rank-specific importance
         rank_importance_dict, rank_category_importance_dict = calculate_rank_specific_importance(
-            df_filtered, X.columns, y_col='ranking', n_ranks=10, n_repeats=50
+            df_filtered, X.columns, y_col='ranking', n_ranks=10, n_repeats=50, n_jobs=n_jobs
         )
         
         rank_feature_dfs = []
@@ -279,27 +379,52 @@ def process_single_file(file_path, output_dir):
         
         if rank_feature_dfs:
             combined_rank_feature_df = pd.concat(rank_feature_dfs, ignore_index=True)
-            rank_feature_output_path = os.path.join(output_dir, f"{file_name}_rank_feature_importance.csv")
-            combined_rank_feature_df.to_csv(rank_feature_output_path, index=False)
+            write_csv_atomic(combined_rank_feature_df, paths['rank_feature'], index=False)
         
         rank_category_df = pd.DataFrame(rank_category_importance_dict).T
         rank_category_df.index.name = 'rank'
-        rank_category_output_path = os.path.join(output_dir, f"{file_name}_rank_category_importance.csv")
-        rank_category_df.to_csv(rank_category_output_path)
+        write_csv_atomic(rank_category_df, paths['rank_category'])
+        return 'done'
         
     except Exception as e:
-        print(f"  Error: {str(e)}")
+        print(f"  Error in {file_name}: {str(e)}")
+        return 'error'
+
+def batch_process_files(input_dir, output_dir, file_pattern="*.csv", search='bayes',
+                        n_jobs=-1, cores_per_file=4, backend='rf'):
+    """Process the files concurrently, `cores_per_file` cores each.
 
-def batch_process_files(input_dir, output_dir, file_pattern="*.csv"):
+    Every parallel stage inside a file (search, final fit, importances) is
+    capped at `cores_per_file`, and `n_jobs // cores_per_file` files run at
+    once in separate processes, largest file first. Files whose four
+    outputs all exist are skipped, so an interrupted batch can be rerun.
+    """
+    from joblib import effective_n_jobs
+    
     os.makedirs(output_dir, exist_ok=True)
     search_pattern = os.path.join(input_dir, file_pattern)
     files = glob.glob(search_pattern)
     
-    if not files:
+    todo = []
+    for file_path in files:
+        file_name = os.path.splitext(os.path.basename(file_path))[0]
+        if all(os.path.exists(path) for path in output_paths(file_name, output_dir).values()):
+            continue
+        todo.append(file_path)
+    print(f"{len(files) - len(todo)} of {len(files)} files already processed")
+    
+    if not todo:
         return
 
-    for i, file_path in enumerate(files, 1):
-        process_single_file(file_path, output_dir)
+    n_cores = effective_n_jobs(n_jobs)
+    cores_per_file = max(1, min(cores_per_file, n_cores))
+    tasks = [(file_path, output_dir, search, cores_per_file, backend) for file_path in todo]
+    costs = [os.path.getsize(file_path) for file_path in todo]
+    status = {}
+    for i, result in enumerate(run_largest_first(process_single_file, tasks, costs,
+                                                 n_jobs=max(1, n_cores // cores_per_file)), 1):
+        status[result] = status.get(result, 0) + 1
+        print(f"{i}/{len(todo)} files finished: {status}")
 
 
 def main():
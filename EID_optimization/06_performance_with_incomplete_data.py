@@ -5,279 +5,516 @@ import random
 import gc
 import os
 import math
-from joblib import Parallel, delayed
 from collections import defaultdict
-import EoN
+import importlib
+import heapq
+import hashlib
+import json
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from joblib import effective_n_jobs
+from eidopt import probability_generate, select_node_outbreak, greedy_max_influence
+from eidopt.checkpoint import network_seed, seed_network
+from eidopt.graphcache import load_gml
+from eidopt.rfsm import RFSMSelector, graph_network_params
+from eidopt.simulation import SimulationPool, SimulationSet, simulate_outbreak
 import warnings
 warnings.filterwarnings('ignore')
 
 # ========== Network Removal Functions ==========
-def remove_x_percent_edges_strong_random(G, X, seed=None, max_try=100000):
-    if seed is not None:
-        random.seed(seed)
-    G = G.copy()
-    
-    total_edges = G.number_of_edges()
-    target_remove = math.floor(total_edges * X / 100)
+def still_connected(adj, u, v):
+    # bidirectional BFS that always grows the smaller side, so proving a
+    # bridge only costs the size of the smaller component it cuts off
+    if u == v:
+        return True
+    seen_a, seen_b = {u}, {v}
+    front_a, front_b = [u], [v]
+    while front_a and front_b:
+        if len(front_a) > len(front_b):
+            seen_a, seen_b, front_a, front_b = seen_b, seen_a, front_b, front_a
+        next_front = []
+        for x in front_a:
+            for y in adj[x]:
+                if y in seen_b:
+                    return True
+                if y not in seen_a:
+                    seen_a.add(y)
+                    next_front.append(y)
+        front_a = next_front
+    return False
+
+def edge_removal_sequence(G, target_remove, seed=None, adj=None):
+    # Same distribution as drawing random edges and putting back the ones that
+    # disconnect G: every accepted edge is uniform over the current non-bridges.
+    # An edge found to be a bridge stays one as edges are removed, so it leaves
+    # the candidate pool for good; a connectivity check runs at most
+    # (removed edges + bridges) times. The removed edges come back in order, and
+    # the first t of them are what a run with target t removes.
+    rng = random.Random(seed)
     
-    removed = 0
-    tries = 0
-    all_edges = list(G.edges())
+    if adj is None:
+        adj = {v: set(G.neighbors(v)) for v in G.nodes()}
+    adj = {v: set(neighbors) for v, neighbors in adj.items()}
+    pool = list(G.edges())
+    removed_edges = []
     
-    while removed < target_remove and tries < max_try:
-        e = random.choice(all_edges)
-        if not G.has_edge(*e):
-            continue
+    while len(removed_edges) < target_remove and pool:
+        i = rng.randrange(len(pool))
+        u, v = pool[i]
+        pool[i] = pool[-1]
+        pool.pop()
         
-        G.remove_edge(*e)
-        if nx.is_connected(G):
-            removed += 1
+        adj[u].discard(v)
+        adj[v].discard(u)
+        if still_connected(adj, u, v):
+            removed_edges.append((u, v))
         else:
-            G.add_edge(*e)
-        tries += 1
+            adj[u].add(v)
+            adj[v].add(u)
+    return removed_edges
+
+def remove_x_percent_edges_strong_random(G, X, seed=None, max_try=None, adj=None):
+    # max_try is kept for compatibility
+    total_edges = G.number_of_edges()
+    target_remove = math.floor(total_edges * X / 100)
+    if target_remove > max_omission(G, 'edges'):
+        return None  # a connected graph keeps at least a spanning tree
     
-    if removed < target_remove:
+    removed_edges = edge_removal_sequence(G, target_remove, seed, adj)
+    if len(removed_edges) < target_remove:
         return None
+    G = G.copy()
+    G.remove_edges_from(removed_edges)
     return G
 
-def remove_x_percent_nodes_strong_random(G, X, seed=None, max_try=100000):
-    if seed is not None:
-        random.seed(seed)
-    G = G.copy()
-    
-    total_nodes = G.number_of_nodes()
-    target_remove = math.floor(total_nodes * X / 100)
+def node_removable(adj, v):
+    # v is not an articulation point iff its neighbours stay connected without it
+    neighbors = adj[v]
+    if len(neighbors) <= 1:
+        return True
+    start = next(iter(neighbors))
+    missing = len(neighbors) - 1
+    seen = {v, start}
+    front = [start]
+    while front:
+        next_front = []
+        for x in front:
+            for y in adj[x]:
+                if y not in seen:
+                    seen.add(y)
+                    if y in neighbors:
+                        missing -= 1
+                        if missing == 0:
+                            return True
+                    next_front.append(y)
+        front = next_front
+    return False
+
+def max_omission(G, omission_type):
+    # most edges (down to a spanning tree) or nodes (down to one) that can go
+    # while the network stays connected
+    if omission_type == 'edges':
+        return G.number_of_edges() - G.number_of_nodes() + 1
+    return G.number_of_nodes() - 1
+
+def omission_limit(G, omission_type):
+    # the same as a percentage
+    total = G.number_of_edges() if omission_type == 'edges' else G.number_of_nodes()
+    return 100 * max_omission(G, omission_type) / total if total else 0
+
+def omission_feasible(G, omission_pct, omission_type):
+    total = G.number_of_edges() if omission_type == 'edges' else G.number_of_nodes()
+    return math.floor(total * omission_pct / 100) <= max_omission(G, omission_type)
+
+def node_removal_sequence(G, target_remove, seed=None, adj=None, max_rejects=20):
+    # Same distribution as drawing random nodes and putting back the ones that
+    # disconnect G: every removed node is uniform over the current
+    # non-articulation nodes. Candidates are drawn at random and checked with a
+    # neighbourhood BFS; after max_rejects rejections in a row the articulation
+    # points are computed once and the node is drawn among the others directly.
+    # A connected graph always has a removable node, so any target below the
+    # number of nodes succeeds. The removed nodes come back in order.
+    rng = random.Random(seed)
     
-    removed = 0
-    tries = 0
-    all_nodes = list(G.nodes())
+    if adj is None:
+        adj = {v: set(G.neighbors(v)) for v in G.nodes()}
+    adj = {v: set(neighbors) for v, neighbors in adj.items()}
+    for v in adj:
+        adj[v].discard(v)  # self-loops do not hold a graph together
+    remaining = list(G.nodes())
+    position = {v: i for i, v in enumerate(remaining)}
     
-    while removed < target_remove and tries < max_try:
-        v = random.choice(all_nodes)
-        if not G.has_node(v):
-            continue
-        
-        neighbors = list(G.neighbors(v))
-        G.remove_node(v)
-        
-        if nx.is_connected(G):
-            removed += 1
-        else:
-            G.add_node(v)
-            for u in neighbors:
-                G.add_edge(v, u)
-        tries += 1
+    def remove(v):
+        i = position.pop(v)
+        last = remaining.pop()
+        if last != v:
+            remaining[i] = last
+            position[last] = i
+        for u in adj.pop(v):
+            adj[u].discard(v)
     
-    if removed < target_remove:
+    removed_nodes = []
+    rejects = 0
+    for _ in range(target_remove):
+        while True:
+            if rejects < max_rejects:
+                v = remaining[rng.randrange(len(remaining))]
+                if node_removable(adj, v):
+                    break
+                rejects += 1
+            else:
+                cut = set(nx.articulation_points(nx.Graph(adj)))
+                removable = [u for u in remaining if u not in cut]
+                v = removable[rng.randrange(len(removable))]
+                break
+        rejects = 0
+        remove(v)
+        removed_nodes.append(v)
+    return removed_nodes
+
+def remove_x_percent_nodes_strong_random(G, X, seed=None, max_try=None, adj=None, max_rejects=20):
+    total_nodes = G.number_of_nodes()
+    target_remove = math.floor(total_nodes * X / 100)
+    if target_remove > max_omission(G, 'nodes'):
         return None
+    
+    # removing from a copy keeps the node order of G, unlike a subgraph of a
+    # node set, so ties in degree-based strategies do not depend on hashing
+    removed_nodes = node_removal_sequence(G, target_remove, seed, adj, max_rejects)
+    G = G.copy()
+    G.remove_nodes_from(removed_nodes)
     return G
 
 def generate_omission_networks(G_original, omission_pct, omission_type, n_instances=10):
-    networks = []
+    # One adjacency for all instances; an infeasible level is reported with the
+    # real limit instead of being inferred from failed retries.
+    if not omission_feasible(G_original, omission_pct, omission_type):
+        print(f"Unable to omit {omission_pct}% of {omission_type}: "
+              f"at most {omission_limit(G_original, omission_type):.1f}% keeps the network connected")
+        return None
     
+    adj = {v: set(G_original.neighbors(v)) for v in G_original.nodes()}
+    networks = []
     for i in range(n_instances):
         seed = random.randint(0, 1000000)
         
         if omission_type == 'edges':
-            G_omission = remove_x_percent_edges_strong_random(G_original, omission_pct, seed=seed)
+            G_omission = remove_x_percent_edges_strong_random(G_original, omission_pct, seed=seed, adj=adj)
         else:  # nodes
-            G_omission = remove_x_percent_nodes_strong_random(G_original, omission_pct, seed=seed)
-        
-        if G_omission is None:
-            print(f"Unable to generate {omission_type} {omission_pct}% '{i+1} instance")
-            return None
+            G_omission = remove_x_percent_nodes_strong_random(G_original, omission_pct, seed=seed, adj=adj)
         
         networks.append(G_omission)
     
     return networks
 
-# ========== Generating emergence probability Functions ==========
-def unique_ranks(data):
-    indexed_data = [(value, index) for index, value in enumerate(data)]
-    sorted_data = sorted(indexed_data, key=lambda x: x[0])
-    ranks = [0] * len(data)
-    for rank, (_, original_index) in enumerate(sorted_data):
-        ranks[original_index] = rank
-    return ranks
-
-def probability_generate(G, alpha, beta, corr, s):
-    probabilities = list(np.random.beta(alpha, beta, s))
-    importance = [t[1] for t in nx.algorithms.centrality.degree_centrality(G).items()]
-    nodes = list(G.nodes)
-    mean = [0, 0]
-    cov = [[1, corr], [corr, 1]]
-    samples = np.random.multivariate_normal(mean, cov, s)
-    x_samples = list(samples[:, 0])
-    y_samples = list(samples[:, 1])
-    rank_importance = unique_ranks(importance)
-    probaility_ranked = []
-    for i in (rank_importance):
-        xt = sorted(x_samples)[i]
-        index_x = x_samples.index(xt)
-        yt = y_samples[index_x]
-        index_y = sorted(y_samples).index(yt)
-        probaility_ranked.append(sorted(probabilities)[index_y])
-    return probaility_ranked, nodes
-
-def select_node_outbreak(p, n):
-    return random.choices(n, weights=p, k=1)[0]
-
-def simulate_one_spread(G, probabilities, node_list, tau=0.5, gamma=1.0):
-    selected_node = select_node_outbreak(probabilities, node_list)
-    sim = EoN.Gillespie_SIR(G, tau=tau, gamma=gamma, initial_infecteds=selected_node, return_full_data=True)
-    result = {
-        "t": list(sim.t()),
-        "cumulative": sim.I() + sim.R(),
-        "node_history": {node: sim.node_history(node) for node in G.nodes()}
-    }
-    return result
-
-def evaluate_sim_result(sim_result, monitor_nodes, total_nodes):
-    """Evaluate with monitor nodes and return percentage"""
-    t_list = sim_result["t"]
-    cumulative = sim_result["cumulative"]
-    histories = sim_result["node_history"]
-    detection_gains = []
+def nested_omission_networks(G_original, omission_percentages, omission_type, seed=None, adj=None):
+    # One removal sequence for all levels: a level removes the first
+    # floor(total * pct / 100) items of it, so each graph extends the one of
+    # the level below. Yields (omission_pct, G_omission, removed since the
+    # previous level) for the feasible levels in increasing order.
+    levels = sorted(omission_percentages)
+    feasible = [pct for pct in levels if omission_feasible(G_original, pct, omission_type)]
+    if len(feasible) < len(levels):
+        print(f"Skipping {[pct for pct in levels if pct not in feasible]}% of {omission_type}: "
+              f"at most {omission_limit(G_original, omission_type):.1f}% keeps the network connected")
+    if not feasible:
+        return
     
-    for s in monitor_nodes:
-        if s not in histories:
-            continue
-        history = histories[s]
-        if len(history[0]) == 3:
-            infect_time = history[0][1]
-            gain = cumulative[-1] - cumulative[t_list.index(infect_time)]
-        elif len(history[0]) == 2:
-            gain = cumulative[-1] - cumulative[0]
-        else:
-            gain = 0
-        detection_gains.append(gain)
+    total = G_original.number_of_edges() if omission_type == 'edges' else G_original.number_of_nodes()
+    counts = [math.floor(total * pct / 100) for pct in feasible]
+    if omission_type == 'edges':
+        sequence = edge_removal_sequence(G_original, counts[-1], seed=seed, adj=adj)
+    else:  # nodes
+        sequence = node_removal_sequence(G_original, counts[-1], seed=seed, adj=adj)
     
-    max_gain = max(detection_gains) if detection_gains else 0
-    return (max_gain / total_nodes) * 100
-
-# Run batch simulations on the network
-def run_batch_simulations(G, probabilities, node_list, n_batches=10, batch_size=100):
-    results = []
-    for batch_idx in range(n_batches):
-        batch = Parallel(n_jobs=-1)(
-            delayed(simulate_one_spread)(G, probabilities, node_list) for _ in range(batch_size)
-        )
-        results.append(batch)
-        if (batch_idx + 1) % 5 == 0:
-            gc.collect()
-    return results
+    G_omission = G_original.copy()
+    start = 0
+    for omission_pct, count in zip(feasible, counts):
+        removed = sequence[start:count]
+        if omission_type == 'edges':
+            G_omission.remove_edges_from(removed)
+        else:
+            G_omission.remove_nodes_from(removed)
+        start = count
+        yield omission_pct, G_omission.copy(), removed
+
+def simulate_one_spread(G, probabilities, node_list, tau=0.5, gamma=1.0, index=None):
+    # infection time and infection order of every node, see eidopt.simulation
+    if index is None:
+        index = {node: i for i, node in enumerate(node_list)}
+    return simulate_outbreak(G, probabilities, node_list, index, tau=tau, gamma=gamma)
+
+def evaluate_sim_result(sim_set, monitor_nodes, total_nodes):
+    """Evaluate with monitor nodes and return percentage, one value per simulation"""
+    return sim_set.detection_gain(monitor_nodes) / total_nodes * 100
+
+# Run batch simulations on the network; pass a SimulationPool to reuse its workers
+def run_batch_simulations(G, probabilities, node_list, n_batches=10, batch_size=100, pool=None, seed=None):
+    if pool is None:
+        with SimulationPool(G, probabilities, node_list, tau=0.5, gamma=1.0) as pool:
+            return pool.run(n_batches * batch_size, n_batches, seed)
+    return pool.run(n_batches * batch_size, n_batches, seed)
 
 # Evaluate strategy performance on simulation results
 def evaluate_strategy(sim_results, node_seq, total_nodes):
-    batch_means = []
-    for batch in sim_results:
-        values = [evaluate_sim_result(sim, node_seq, total_nodes) for sim in batch]
-        batch_means.append(np.mean(values))
-    mean_val = np.mean(batch_means)
+    values = evaluate_sim_result(sim_results, node_seq, total_nodes)
+    mean_val = np.mean(sim_results.batch_means(values))
     return mean_val
 
 # ========== Strategy Selection Functions ==========
-def greedy_max_influence(G, node_list, probabilities, rounds, simulations=1000):
-    rounds = min(rounds, len(node_list))
-    best = []
-    available_nodes = set(node_list)
-    for step in range(rounds):
-        candidates = [best + [x] for x in available_nodes]
-        mean_gains = np.zeros(len(candidates))
-        for sim_idx in range(simulations):
-            selected_node = select_node_outbreak(probabilities, node_list)
-            sim = EoN.Gillespie_SIR(G, tau=0.5, gamma=1., initial_infecteds=selected_node, return_full_data=True)
-            b, c = list(sim.t()), sim.I() + sim.R()
-            for i, candidate in enumerate(candidates):
-                g_max = 0
-                for s in candidate:
-                    m1 = sim.node_history(s)
-                    if len(m1[0]) == 3:
-                        g1 = c[-1] - c[b.index(m1[0][1])]
-                    elif len(m1[0]) == 2:
-                        g1 = c[-1] - c[0]
-                    else:
-                        g1 = 0
-                    g_max = max(g_max, g1)
-                mean_gains[i] += g_max
-        mean_gains /= simulations
-        best_idx = np.argmax(mean_gains)
-        best = candidates[best_idx]
-        available_nodes.remove(best[-1])
-    return best
-
-def get_global_strategy(G, num_monitors):
-    num_monitors = min(num_monitors, G.number_of_nodes())
+def degree_order(G):
     degrees = dict(G.degree())
-    sorted_nodes = sorted(degrees, key=degrees.get, reverse=True)
-    return sorted_nodes[:num_monitors]
+    return sorted(degrees, key=degrees.get, reverse=True)
 
-def get_modular_strategy(G, num_monitors):
-    num_monitors = min(num_monitors, G.number_of_nodes())
-    communities = nx.community.greedy_modularity_communities(G)
-    modular_nodes = []
-    community_nodes_by_degree = []
-    for community in communities:
-        community_degrees = {node: G.degree(node) for node in community}
-        sorted_community = sorted(community, key=lambda x: community_degrees[x], reverse=True)
-        community_nodes_by_degree.append(sorted_community)
-    selection_round = 0
-    while len(modular_nodes) < num_monitors:
-        added_in_round = False
+def modular_order(G, communities=None):
+    # round robin over the communities, each in decreasing degree; every node
+    # is in a community, so this ranks all of them
+    if communities is None:
+        communities = nx.community.greedy_modularity_communities(G)
+    community_nodes_by_degree = [sorted(community, key=G.degree, reverse=True) for community in communities]
+    order = []
+    for selection_round in range(max(map(len, community_nodes_by_degree), default=0)):
         for community_nodes in community_nodes_by_degree:
-            if len(modular_nodes) >= num_monitors:
-                break
             if selection_round < len(community_nodes):
-                candidate = community_nodes[selection_round]
-                if candidate not in modular_nodes:
-                    modular_nodes.append(candidate)
-                    added_in_round = True
-        if not added_in_round:
-            break
-        selection_round += 1
-    if len(modular_nodes) < num_monitors:
-        degrees = dict(G.degree())
-        sorted_nodes = sorted(degrees, key=degrees.get, reverse=True)
-        remaining_nodes = [n for n in sorted_nodes if n not in modular_nodes]
-        needed = num_monitors - len(modular_nodes)
-        modular_nodes.extend(remaining_nodes[:needed])
-    return modular_nodes[:num_monitors]
+                order.append(community_nodes[selection_round])
+    return order
+
+def get_global_strategy(G, num_monitors):
+    return degree_order(G)[:num_monitors]
+
+def get_modular_strategy(G, num_monitors, communities=None):
+    return modular_order(G, communities)[:num_monitors]
 
 def get_random_strategy(G, num_monitors):
     num_monitors = min(num_monitors, G.number_of_nodes())
     nodes = list(G.nodes())
     return random.sample(nodes, num_monitors)
 
+def get_greedy_strategy(G, probabilities, num_monitors):
+    node_rankings = greedy_max_influence(G, list(G.nodes()), probabilities, rounds=num_monitors, tau=0.5)
+    return sorted(node_rankings, key=node_rankings.get)
+
+def get_rfsm_strategy(selector, G, probabilities, num_monitors, probability_params, communities=None):
+    # generator parameters are estimated from the graph; alpha/beta/corr are the ones used for the probabilities
+    network_params = {**graph_network_params(G, communities), **probability_params}
+    return selector.select(G, probabilities, num_monitors, network_params=network_params)
+
+def get_ga_strategy(G, probabilities, num_monitors):
+    ga_module = importlib.import_module('03_genetic_algorithm')
+    ga = ga_module.GeneticAlgorithmNodeSelection(G, probabilities, list(G.nodes()), num_monitors, num_simulations=100)
+    best_subset, _ = ga.run()
+    return list(best_subset)
+
+class GraphStrategies:
+    """Sentinel choices of every strategy on one graph.
+
+    Global, Modular and RFSM are deterministic and add sentinels one at a
+    time, so the choice for k sentinels is the first k nodes of one ranking.
+    Each ranking is computed once per graph, long enough for
+    `max_sentinels`, and the communities are shared by Modular and RFSM.
+    Greedy (Monte Carlo), Random and GA are drawn again on every call.
+    `advance` carries the state to the next level of a nested omission.
+    """
+    deterministic = ('Global', 'Modular', 'RFSM')
+
+    def __init__(self, G, probabilities, max_sentinels, rfsm_selector=None, probability_params=None,
+                 redetect_after=0.2):
+        self.G = G
+        self.probabilities = probabilities
+        self.max_sentinels = max_sentinels
+        self.rfsm_selector = rfsm_selector
+        self.probability_params = probability_params
+        self.redetect_after = redetect_after
+        self.names = ['Greedy', 'RFSM', 'Global', 'Modular', 'Random', 'GA']
+        if rfsm_selector is None:
+            self.names.remove('RFSM')
+        self._communities = None
+        self._detected_edges = None  # edges of the graph the communities were detected on
+        self._position = None
+        self._rankings = {}
+
+    @property
+    def communities(self):
+        if self._communities is None:
+            self._communities = nx.community.greedy_modularity_communities(self.G)
+            self._detected_edges = self.G.number_of_edges()
+        return self._communities
+
+    def advance(self, G, probabilities, removed, omission_type):
+        """Strategies of the next nested level, `G` being this graph minus the `removed` edges or nodes.
+
+        The degree order is re-sorted only for the nodes whose degree
+        changed and merged back. The communities are carried over,
+        restricted to the remaining nodes and split into connected parts,
+        until more than `redetect_after` of the edges they were detected on
+        are gone; then, or with `redetect_after=None`, they are detected
+        again. RFSM is ranked again, its static features being global.
+        """
+        nxt = GraphStrategies(G, probabilities, self.max_sentinels, self.rfsm_selector,
+                              self.probability_params, self.redetect_after)
+        # G keeps the node order of this graph (edges and nodes are removed
+        # from a copy), so degree ties still break by that order
+        nxt._position = self._position or {v: i for i, v in enumerate(self.G.nodes())}
+        if 'Global' in self._rankings:
+            if omission_type == 'edges':
+                gone, changed = set(), {v for edge in removed for v in edge}
+            else:
+                gone = set(removed)
+                changed = {u for v in removed for u in self.G.neighbors(v)} - gone
+            key = lambda v: (-G.degree(v), nxt._position[v])
+            kept = [v for v in self._rankings['Global'] if v not in changed and v not in gone]
+            nxt._rankings['Global'] = list(heapq.merge(kept, sorted(changed, key=key), key=key))
+        
+        if (self._communities is not None and self.redetect_after is not None
+                and self._detected_edges - G.number_of_edges() <= self.redetect_after * self._detected_edges):
+            parts = []
+            for community in self._communities:
+                kept = [v for v in community if v in G]
+                parts.extend(frozenset(part) for part in nx.connected_components(G.subgraph(kept)))
+            nxt._communities = sorted(parts, key=len, reverse=True)
+            nxt._detected_edges = self._detected_edges
+        return nxt
+
+    def ranking(self, name):
+        if name not in self._rankings:
+            if name == 'Global':
+                self._rankings[name] = degree_order(self.G)
+            elif name == 'Modular':
+                self._rankings[name] = modular_order(self.G, self.communities)
+            else:  # RFSM
+                self._rankings[name] = get_rfsm_strategy(self.rfsm_selector, self.G, self.probabilities,
+                                                         self.max_sentinels, self.probability_params,
+                                                         self.communities)
+        return self._rankings[name]
+
+    def select(self, name, num_monitors):
+        if name in self.deterministic:
+            return self.ranking(name)[:num_monitors]
+        if name == 'Greedy':
+            return get_greedy_strategy(self.G, self.probabilities, num_monitors)
+        if name == 'Random':
+            return get_random_strategy(self.G, num_monitors)
+        return get_ga_strategy(self.G, self.probabilities, num_monitors)
+
 # ========== Main Evaluation Function ==========
+def load_original_network(original_gml_path, probability_params):
+    network_name = os.path.splitext(os.path.basename(original_gml_path))[0]
+    
+    # largest connected component, parsed once and then read from the binary cache
+    G_original = load_gml(original_gml_path)
+    
+    nodes_original = list(G_original.nodes())
+    probabilities_original, _ = probability_generate(G_original, probability_params['alpha'],
+                                                     probability_params['beta'], probability_params['corr'],
+                                                     len(nodes_original))
+    return network_name, G_original, nodes_original, probabilities_original
+
+def evaluate_omission_instance(G_omission, node_to_prob, nodes_original, all_sim_sets, num_sentinels_list,
+                               n_strategy_repetitions, rfsm_selector, probability_params, strategies=None):
+    # one row per sentinel count and strategy on one omission network
+    rows = []
+    nodes_omission = list(G_omission.nodes())
+    probabilities_omission = [node_to_prob[node] for node in nodes_omission if node in node_to_prob]
+    # deterministic rankings are computed once and cut for every sentinel count
+    if strategies is None:
+        strategies = GraphStrategies(G_omission, probabilities_omission, max(num_sentinels_list),
+                                     rfsm_selector, probability_params)
+    
+    # All selections first, in the order they were always drawn, then one
+    # scoring pass over the table of sentinel sets per simulation set
+    keys = []
+    selections = [[] for _ in range(n_strategy_repetitions)]
+    for num_sentinels in num_sentinels_list:
+        if len(nodes_omission) < num_sentinels:
+            continue
+        for strategy_name in strategies.names:
+            keys.append((num_sentinels, strategy_name))
+            for rep in range(n_strategy_repetitions):
+                selections[rep].append(strategies.select(strategy_name, num_sentinels))
+    if not keys:
+        return rows
+    
+    performances = np.empty((n_strategy_repetitions, len(keys)))
+    valid_counts = np.empty((n_strategy_repetitions, len(keys)))
+    for rep in range(n_strategy_repetitions):
+        sim_results_for_rep = all_sim_sets[rep]
+        index_sets = sim_results_for_rep.index_sets(selections[rep])
+        performances[rep], _, valid_counts[rep] = sim_results_for_rep.score_sets(index_sets, len(nodes_original))
+    
+    for j, (num_sentinels, strategy_name) in enumerate(keys):
+        rows.append({
+            'num_sentinels': num_sentinels,
+            'strategy': strategy_name,
+            'surveillance_performance_mean': np.mean(performances[:, j]),
+            'surveillance_performance_std': np.std(performances[:, j], ddof=1),
+            'valid_monitors': np.mean(valid_counts[:, j]),
+            'total_monitors': num_sentinels,
+            'original_network_size': len(nodes_original),
+            'omission_network_nodes': len(nodes_omission),
+            'omission_network_edges': G_omission.number_of_edges()
+        })
+    return rows
+
+def evaluate_nested_instance(G_original, omission_percentages, omission_type, seed, node_to_prob, nodes_original,
+                             all_sim_sets, num_sentinels_list, n_strategy_repetitions, rfsm_selector,
+                             probability_params, adj=None):
+    # all levels of one removal sequence; each level's strategies are advanced from the level below
+    rows = []
+    strategies = None
+    for omission_pct, G_omission, removed in nested_omission_networks(G_original, omission_percentages,
+                                                                      omission_type, seed, adj):
+        probabilities_omission = [node_to_prob[node] for node in G_omission.nodes() if node in node_to_prob]
+        if strategies is None:
+            strategies = GraphStrategies(G_omission, probabilities_omission, max(num_sentinels_list),
+                                         rfsm_selector, probability_params)
+        else:
+            strategies = strategies.advance(G_omission, probabilities_omission, removed, omission_type)
+        for row in evaluate_omission_instance(G_omission, node_to_prob, nodes_original, all_sim_sets,
+                                              num_sentinels_list, n_strategy_repetitions, rfsm_selector,
+                                              probability_params, strategies):
+            rows.append({'omission_pct': omission_pct, **row})
+        gc.collect()
+    return rows
+
 def evaluate_network_with_omissions(original_gml_path, 
                                    omission_percentages=[0, 10, 20, 30, 40, 50, 60, 70, 80, 90],
                                    omission_types=['edges', 'nodes'],
                                    num_sentinels_list=[3, 6, 9],
                                    n_omission_instances=10,
-                                   n_strategy_repetitions=10):
+                                   n_strategy_repetitions=10,
+                                   rfsm_model_path=None,
+                                   results_path=None,
+                                   n_jobs=-1,
+                                   seed=42,
+                                   nested=False):
+    # with results_path, run as independent tasks on a process pool and
+    # append to that table (see evaluate_network_with_omissions_parallel);
+    # with nested, every instance is one removal sequence over all levels
+    if results_path is not None:
+        return evaluate_network_with_omissions_parallel(
+            original_gml_path, results_path, omission_percentages, omission_types, num_sentinels_list,
+            n_omission_instances, n_strategy_repetitions, rfsm_model_path, n_jobs, seed, nested)
+    
     results_list = []
+    # the forest is loaded once; without a model path the RFSM strategy is left out
+    rfsm_selector = RFSMSelector.load(rfsm_model_path) if rfsm_model_path else None
+    probability_params = {'alpha': 0.1, 'beta': 5, 'corr': -0.7}
     
     # Load original network
-    network_name = os.path.splitext(os.path.basename(original_gml_path))[0]
-    
-    G_original = nx.read_gml(original_gml_path)
-    if not nx.is_connected(G_original):
-        largest_cc = max(nx.connected_components(G_original), key=len)
-        G_original = G_original.subgraph(largest_cc).copy()
-    
-    nodes_original = list(G_original.nodes())
-    probabilities_original, _ = probability_generate(G_original, 0.1, 5, -0.7, len(nodes_original))
+    network_name, G_original, nodes_original, probabilities_original = load_original_network(
+        original_gml_path, probability_params)
     node_to_prob = dict(zip(nodes_original, probabilities_original))
     
     print(f"Original network: {len(nodes_original)} nodes, {G_original.number_of_edges()} edges")
     # Pre-run simulations on original network
+    # one pool for all sets: the graph is sent to each worker once
     all_sim_sets = []
-    for rep in range(n_strategy_repetitions):
-        print(f"  Simulation set {rep+1}/{n_strategy_repetitions}...", end='\r')
-        sim_results = run_batch_simulations(G_original, probabilities_original, nodes_original, 
-                                           n_batches=10, batch_size=100)
-        all_sim_sets.append(sim_results)
-        gc.collect()
+    with SimulationPool(G_original, probabilities_original, nodes_original, tau=0.5, gamma=1.0) as pool:
+        for rep in range(n_strategy_repetitions):
+            print(f"  Simulation set {rep+1}/{n_strategy_repetitions}...", end='\r')
+            sim_results = run_batch_simulations(G_original, probabilities_original, nodes_original,
+                                                n_batches=10, batch_size=100, pool=pool)
+            all_sim_sets.append(sim_results)
     
     # Process each removal type
     for omission_type in omission_types:
@@ -285,6 +522,23 @@ def evaluate_network_with_omissions(original_gml_path,
         print(f"Omission type: {omission_type.upper()}")
         print(f"{'-'*80}")
         
+        print(f"Connectivity limit: {omission_limit(G_original, omission_type):.1f}% of {omission_type}")
+        
+        if nested:
+            for instance_idx in range(n_omission_instances):
+                print(f"    Instance {instance_idx+1}/{n_omission_instances}: nested levels")
+                rows = evaluate_nested_instance(G_original, omission_percentages, omission_type,
+                                                random.randint(0, 1000000), node_to_prob, nodes_original,
+                                                all_sim_sets, num_sentinels_list, n_strategy_repetitions,
+                                                rfsm_selector, probability_params)
+                for row in rows:
+                    results_list.append({
+                        'network_name': network_name,
+                        'omission_type': omission_type,
+                        **row
+                    })
+            continue
+        
         # Track if we've reached structural limits
         limit_reached = False
         
@@ -312,59 +566,16 @@ def evaluate_network_with_omissions(original_gml_path,
                 print(f"    Instance {instance_idx+1}/{n_omission_instances}: "
                       f"{G_omission.number_of_nodes()} nodes, {G_omission.number_of_edges()} edges")
                 
-                nodes_omission = list(G_omission.nodes())
-                probabilities_omission = [node_to_prob[node] for node in nodes_omission if node in node_to_prob]
-                
-                # Process each sentinel count
-                for num_sentinels in num_sentinels_list:
-                    if len(nodes_omission) < num_sentinels:
-                        continue
-                    
-                    # Define strategies
-                    strategy_functions = {
-                        'Greedy': ...
-                        'RFSM': ...
-                        'Global': ...
-                        'Modular': ...
-                        'Random': ...
-                        'GA': ...
-                    }
-                    
-                    # Evaluate each strategy
-                    for strategy_name, strategy_func in strategy_functions.items():
-                        all_performances = []
-                        all_valid_counts = []
-                        
-                        for rep in range(n_strategy_repetitions):
-                            selected_nodes = strategy_func()
-                            valid_monitors = [n for n in selected_nodes if n in nodes_original]
-                            all_valid_counts.append(len(valid_monitors))
-
-                            sim_results_for_rep = all_sim_sets[rep]
-                            performance = evaluate_strategy(
-                                sim_results_for_rep, selected_nodes, len(nodes_original)
-                            )
-                            all_performances.append(performance)
-
-                        mean_performance = np.mean(all_performances)
-                        std_performance  = np.std(all_performances, ddof=1)
-                        mean_valid       = np.mean(all_valid_counts)
-
-                        
-                        results_list.append({
-                            'network_name': network_name,
-                            'omission_type': omission_type,
-                            'omission_pct': omission_pct,
-                            'num_sentinels': num_sentinels,
-                            'strategy': strategy_name,
-                            'surveillance_performance_mean': mean_performance,
-                            'surveillance_performance_std': std_performance,
-                            'valid_monitors': mean_valid,
-                            'total_monitors': num_sentinels,
-                            'original_network_size': len(nodes_original),
-                            'omission_network_nodes': len(nodes_omission),
-                            'omission_network_edges': G_omission.number_of_edges()
-                        })
+                rows = evaluate_omission_instance(G_omission, node_to_prob, nodes_original, all_sim_sets,
+                                                  num_sentinels_list, n_strategy_repetitions,
+                                                  rfsm_selector, probability_params)
+                for row in rows:
+                    results_list.append({
+                        'network_name': network_name,
+                        'omission_type': omission_type,
+                        'omission_pct': omission_pct,
+                        **row
+                    })
                 
                 gc.collect()
     
@@ -374,4 +585,220 @@ def evaluate_network_with_omissions(original_gml_path,
     
     return results_list
 
-    
\ No newline at end of file
+# ========== Parallel, Resumable Evaluation ==========
+# One task is one omission instance: it draws its network and evaluates every
+# sentinel count and strategy on it. The rows of a finished task are appended
+# to the results table in a single write, so a key in the table means the
+# whole instance is done and a restarted run skips it.
+RESULT_KEY = ['network_name', 'omission_type', 'omission_pct', 'instance']
+
+# state of the worker process, set once by init_omission_worker
+_OMISSION_WORKER = {}
+
+def task_seed(seed, network_name, omission_type, omission_pct, instance_idx):
+    # own stream per instance, independent of the worker and of the run order
+    key = f"{network_name}|{omission_type}|{omission_pct}|{instance_idx}"
+    return network_seed(seed, zlib.crc32(key.encode()))
+
+def completed_tasks(results_path):
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        return set()
+    done = pd.read_csv(results_path, usecols=RESULT_KEY, dtype={'network_name': str, 'omission_type': str})
+    return set(done.drop_duplicates().itertuples(index=False, name=None))
+
+def repair_results_table(results_path):
+    # An interrupted write can only hit the last task, so a partial last line
+    # drops the rows of that whole task and it is evaluated again.
+    if not os.path.exists(results_path):
+        return
+    with open(results_path, 'rb+') as f:
+        lines = f.read().split(b'\n')
+        if lines[-1] == b'':
+            return
+        lines.pop()
+        if len(lines) > 1:
+            key = lines[-1].split(b',')[:len(RESULT_KEY)]
+            while len(lines) > 1 and lines[-1].split(b',')[:len(RESULT_KEY)] == key:
+                lines.pop()
+        f.seek(0)
+        f.truncate()
+        f.write(b''.join(line + b'\n' for line in lines))
+
+def append_rows(results_path, rows):
+    if not rows:
+        return
+    header = not os.path.exists(results_path) or os.path.getsize(results_path) == 0
+    text = pd.DataFrame(rows).to_csv(index=False, header=header)
+    fd = os.open(results_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, text.encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def simulation_set_params(probabilities, probability_params, network_name, rep, seed,
+                          n_batches=10, batch_size=100, tau=0.5, gamma=1.0):
+    # everything a stored set depends on, in the JSON form it is saved in
+    return json.loads(json.dumps({
+        'seed': [int(seed), zlib.crc32(network_name.encode()), rep],
+        'n_batches': n_batches,
+        'batch_size': batch_size,
+        'tau': tau,
+        'gamma': gamma,
+        'probability_params': probability_params,
+        # the probabilities in node order also pin down the nodes they were drawn for
+        'probabilities': hashlib.sha256(np.asarray(probabilities, dtype=np.float64).tobytes()).hexdigest(),
+    }))
+
+def load_or_simulate_sets(G_original, probabilities_original, nodes_original, sims_dir,
+                          n_strategy_repetitions, n_jobs, seed, probability_params):
+    # seeded sets stored next to the results, so a restart evaluates against
+    # the same outbreaks; workers memory-map them instead of receiving copies.
+    # A stored set simulated with other settings is simulated again.
+    network_name = os.path.basename(sims_dir)
+    expected = [simulation_set_params(probabilities_original, probability_params, network_name, rep, seed)
+                for rep in range(n_strategy_repetitions)]
+    stored = [SimulationSet.stored_params(os.path.join(sims_dir, f"set_{rep}"))
+              for rep in range(n_strategy_repetitions)]
+    stale = [rep for rep in range(n_strategy_repetitions) if stored[rep] not in (None, expected[rep])]
+    if stale:
+        print(f"  Simulation sets {stale} were simulated with other settings, simulating them again")
+    missing = [rep for rep in range(n_strategy_repetitions) if stored[rep] != expected[rep]]
+    if missing:
+        with SimulationPool(G_original, probabilities_original, nodes_original, tau=0.5, gamma=1.0,
+                            n_jobs=n_jobs) as pool:
+            for rep in missing:
+                print(f"  Simulation set {rep+1}/{n_strategy_repetitions}...", end='\r')
+                params = expected[rep]
+                sim_results = run_batch_simulations(G_original, probabilities_original, nodes_original,
+                                                    n_batches=params['n_batches'],
+                                                    batch_size=params['batch_size'], pool=pool,
+                                                    seed=params['seed'])
+                sim_results.params = params
+                set_dir = os.path.join(sims_dir, f"set_{rep}")
+                # meta.json goes last, so only complete sets count as stored
+                if os.path.exists(os.path.join(set_dir, 'meta.json')):
+                    os.remove(os.path.join(set_dir, 'meta.json'))
+                sim_results.save(set_dir)
+
+def init_omission_worker(G_original, node_to_prob, sims_dir, n_strategy_repetitions, num_sentinels_list,
+                         rfsm_model_path, probability_params):
+    _OMISSION_WORKER.update({
+        'G_original': G_original,
+        'adj': {v: set(G_original.neighbors(v)) for v in G_original.nodes()},
+        'nodes_original': list(G_original.nodes()),
+        'node_to_prob': node_to_prob,
+        'all_sim_sets': [SimulationSet.load(os.path.join(sims_dir, f"set_{rep}"))
+                         for rep in range(n_strategy_repetitions)],
+        'num_sentinels_list': num_sentinels_list,
+        'n_strategy_repetitions': n_strategy_repetitions,
+        'rfsm_selector': RFSMSelector.load(rfsm_model_path) if rfsm_model_path else None,
+        'probability_params': probability_params,
+    })
+
+def run_omission_task(network_name, omission_type, omission_pct, instance_idx, seed):
+    state = _OMISSION_WORKER
+    # the instance seed drives the omission and, through the global
+    # generators, the Random and GA strategies
+    instance_seed = task_seed(seed, network_name, omission_type, omission_pct, instance_idx)
+    seed_network(instance_seed, 0)
+    if omission_type == 'edges':
+        G_omission = remove_x_percent_edges_strong_random(state['G_original'], omission_pct,
+                                                          seed=instance_seed, adj=state['adj'])
+    else:  # nodes
+        G_omission = remove_x_percent_nodes_strong_random(state['G_original'], omission_pct,
+                                                          seed=instance_seed, adj=state['adj'])
+    
+    rows = evaluate_omission_instance(G_omission, state['node_to_prob'], state['nodes_original'],
+                                      state['all_sim_sets'], state['num_sentinels_list'],
+                                      state['n_strategy_repetitions'], state['rfsm_selector'],
+                                      state['probability_params'])
+    key = dict(zip(RESULT_KEY, (network_name, omission_type, omission_pct, instance_idx)))
+    gc.collect()
+    return [{**key, **row} for row in rows]
+
+def run_nested_omission_task(network_name, omission_type, omission_percentages, instance_idx, seed):
+    # all levels of one instance; its rows are keyed by the level they belong to
+    state = _OMISSION_WORKER
+    instance_seed = task_seed(seed, network_name, omission_type, 'nested', instance_idx)
+    seed_network(instance_seed, 0)
+    rows = evaluate_nested_instance(state['G_original'], omission_percentages, omission_type, instance_seed,
+                                    state['node_to_prob'], state['nodes_original'], state['all_sim_sets'],
+                                    state['num_sentinels_list'], state['n_strategy_repetitions'],
+                                    state['rfsm_selector'], state['probability_params'], adj=state['adj'])
+    key = {'network_name': network_name, 'omission_type': omission_type}
+    return [{**key, 'omission_pct': row['omission_pct'], 'instance': instance_idx, **row} for row in rows]
+
+def evaluate_network_with_omissions_parallel(original_gml_path, results_path,
+                                             omission_percentages=[0, 10, 20, 30, 40, 50, 60, 70, 80, 90],
+                                             omission_types=['edges', 'nodes'],
+                                             num_sentinels_list=[3, 6, 9],
+                                             n_omission_instances=10,
+                                             n_strategy_repetitions=10,
+                                             rfsm_model_path=None,
+                                             n_jobs=-1,
+                                             seed=42,
+                                             nested=False):
+    probability_params = {'alpha': 0.1, 'beta': 5, 'corr': -0.7}
+    network_name = os.path.splitext(os.path.basename(original_gml_path))[0]
+    # probabilities are drawn from a seeded stream, so they match the stored simulation sets
+    seed_network(seed, zlib.crc32(network_name.encode()))
+    network_name, G_original, nodes_original, probabilities_original = load_original_network(
+        original_gml_path, probability_params)
+    node_to_prob = dict(zip(nodes_original, probabilities_original))
+    print(f"Original network: {len(nodes_original)} nodes, {G_original.number_of_edges()} edges")
+    
+    sims_dir = os.path.join(os.path.splitext(results_path)[0] + '_simulations', network_name)
+    load_or_simulate_sets(G_original, probabilities_original, nodes_original, sims_dir,
+                          n_strategy_repetitions, n_jobs, seed, probability_params)
+    
+    repair_results_table(results_path)
+    done = completed_tasks(results_path)
+    tasks = []
+    for omission_type in omission_types:
+        print(f"Connectivity limit: {omission_limit(G_original, omission_type):.1f}% of {omission_type}")
+        levels = []
+        for omission_pct in omission_percentages:
+            if not omission_feasible(G_original, omission_pct, omission_type):
+                print(f"  Skipping {omission_pct}% of {omission_type} (structural limit reached)")
+                continue
+            levels.append(omission_pct)
+        for instance_idx in range(n_omission_instances):
+            pending = [pct for pct in levels if (network_name, omission_type, pct, instance_idx) not in done]
+            # a nested instance is one task over all its levels; finished levels are not written again
+            if nested and pending:
+                tasks.append((run_nested_omission_task,
+                              (network_name, omission_type, levels, instance_idx, seed)))
+            elif not nested:
+                tasks.extend((run_omission_task, (network_name, omission_type, pct, instance_idx, seed))
+                             for pct in pending)
+    print(f"{len(tasks)} tasks to evaluate, {len(done)} instances already in {results_path}")
+    
+    init_args = (G_original, node_to_prob, sims_dir, n_strategy_repetitions, num_sentinels_list,
+                 rfsm_model_path, probability_params)
+    n_workers = min(effective_n_jobs(n_jobs), len(tasks))
+    if n_workers > 1:
+        with ProcessPoolExecutor(n_workers, initializer=init_omission_worker, initargs=init_args) as executor:
+            futures = [executor.submit(function, *args) for function, args in tasks]
+            for i, future in enumerate(as_completed(futures), 1):
+                append_rows(results_path, [row for row in future.result()
+                                           if tuple(row[k] for k in RESULT_KEY) not in done])
+                print(f"  {i}/{len(tasks)} tasks done", end='\r')
+    elif tasks:
+        init_omission_worker(*init_args)
+        for i, (function, args) in enumerate(tasks, 1):
+            append_rows(results_path, [row for row in function(*args)
+                                       if tuple(row[k] for k in RESULT_KEY) not in done])
+            print(f"  {i}/{len(tasks)} tasks done", end='\r')
+        _OMISSION_WORKER.clear()
+    
+    results = pd.read_csv(results_path, dtype={'network_name': str, 'omission_type': str})
+    return results[results['network_name'] == network_name].to_dict('records')
+
+def run_omission_sweep(gml_paths, results_path, **kwargs):
+    # networks one after another, each using every core; rerun to resume
+    results_list = []
+    for gml_path in gml_paths:
+        print(f"\n{'='*80}\n{os.path.basename(gml_path)}\n{'='*80}")
+        results_list.extend(evaluate_network_with_omissions_parallel(gml_path, results_path, **kwargs))
+    return results_list
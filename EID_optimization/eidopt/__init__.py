@@ -0,0 +1,68 @@
+"""Shared functions for the EID_optimization scripts.
+
+Submodules are imported on first attribute access, and heavy dependencies
+(EoN, scipy, sklearn, joblib, ...) are imported inside the functions that
+use them, so `import eidopt` stays cheap for joblib workers and short CLI
+runs. See `eidopt._importtime` for the import-time budget.
+"""
+import importlib
+
+_EXPORTS = {
+    'heterogeneous_dist': 'networks',
+    'connect_stubs': 'networks',
+    'modular_config_model': 'networks',
+    'network_generator': 'networks',
+    'unique_ranks': 'probability',
+    'probability_generate': 'probability',
+    'select_node_outbreak': 'greedy',
+    'default_tau': 'greedy',
+    'greedy_max_influence': 'greedy',
+    'tie_unranked': 'greedy',
+    'network_seed': 'checkpoint',
+    'seed_network': 'checkpoint',
+    'NetworkCheckpoint': 'checkpoint',
+    'TrainingDatasetWriter': 'dataset',
+    'dataset_columns': 'dataset',
+    'load_training_data': 'dataset',
+    'estimate_network_cost': 'scheduler',
+    'run_largest_first': 'scheduler',
+    'JobTable': 'jobs',
+    'drain': 'jobs',
+    'merge_outputs': 'jobs',
+    'GroupedNDCGScorer': 'scoring',
+    'ndcg_per_group': 'scoring',
+    'permutation_importance_batched': 'importance',
+    'RFSMSelector': 'rfsm',
+    'static_node_features': 'rfsm',
+    'graph_network_params': 'rfsm',
+    'export_forest': 'forest',
+    'CompactForest': 'forest',
+    'simulate_outbreak': 'simulation',
+    'SimulationSet': 'simulation',
+    'SimulationPool': 'simulation',
+    'OutbreakBank': 'streaming',
+    'StreamingSentinels': 'streaming',
+    'load_gml': 'graphcache',
+    'gml_csr': 'graphcache',
+    'largest_component': 'graphcache',
+    'WarmStartBayesSearchCV': 'training',
+    'group_split': 'training',
+    'SuccessiveHalvingSearch': 'training',
+    'sample_candidates': 'training',
+    'make_surrogate': 'training',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,70 @@
+"""Import-time budget for eidopt.
+
+    python -m eidopt._importtime
+
+Each statement below runs in a fresh interpreter under `-X importtime`; the
+cumulative time of the outermost import is compared with its budget. The
+budgets cover numpy/networkx but none of EoN, scipy, sklearn or joblib, so a
+top-level import of any of those makes the check fail.
+"""
+import subprocess
+import sys
+
+# seconds, cumulative
+IMPORT_BUDGETS = {
+    'eidopt': 0.05,
+    'eidopt.networks': 0.5,
+    'eidopt.probability': 0.8,
+    'eidopt.greedy': 0.5,
+    'eidopt.checkpoint': 0.5,
+    'eidopt.dataset': 0.05,
+    'eidopt.scheduler': 0.05,
+    'eidopt.jobs': 0.1,
+    'eidopt.scoring': 0.3,
+    'eidopt.importance': 0.3,
+    'eidopt.rfsm': 0.3,
+    'eidopt.forest': 0.3,
+    'eidopt.simulation': 0.3,
+    'eidopt.streaming': 0.3,
+    'eidopt.graphcache': 0.3,
+}
+
+FORBIDDEN_AT_IMPORT = ('EoN', 'scipy', 'sklearn', 'skopt', 'joblib', 'matplotlib', 'pyarrow', 'pandas')
+
+
+def measure_import(module, repeats=3):
+    best = None
+    loaded = set()
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, check=True
+        )
+        cumulative = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumul_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+            cumulative[name] = int(cumul_us)
+            loaded.add(name.split('.')[0])
+        seconds = cumulative.get(module, 0) / 1e6
+        best = seconds if best is None else min(best, seconds)
+    return best, loaded
+
+
+def check_budget(budgets=IMPORT_BUDGETS, verbose=True):
+    ok = True
+    for module, budget in budgets.items():
+        seconds, loaded = measure_import(module)
+        heavy = sorted(m for m in FORBIDDEN_AT_IMPORT if m in loaded)
+        passed = seconds <= budget and not heavy
+        ok = ok and passed
+        if verbose:
+            status = 'ok' if passed else 'OVER'
+            extra = f" (loads {', '.join(heavy)})" if heavy else ''
+            print(f"{module:<24} {seconds * 1000:8.1f} ms / {budget * 1000:6.0f} ms  {status}{extra}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_budget() else 1)
@@ -0,0 +1,71 @@
+import os
+import random
+import re
+
+import numpy as np
+
+
+# ========== Per-network seeding ==========
+def network_seed(base_seed, network_id):
+    # independent stream per network, so the result does not depend on which
+    # worker ran it or on how many networks were generated before it
+    return int(np.random.SeedSequence([base_seed, network_id]).generate_state(1)[0])
+
+
+def seed_network(base_seed, network_id):
+    seed = network_seed(base_seed, network_id)
+    random.seed(seed)
+    np.random.seed(seed)
+    return seed
+
+
+# ========== Network-level checkpoint ==========
+class NetworkCheckpoint:
+    """One file per finished network in `directory`.
+
+    `network_<id>.csv` holds the samples of a network, `network_<id>.skip`
+    marks a network that produced no samples. Both count as completed, so a
+    restarted run does not retry networks that were rejected.
+    """
+
+    _pattern = re.compile(r'^network_(\d+)\.(csv|skip)$')
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, network_id, kind='csv'):
+        return os.path.join(self.directory, f"network_{network_id}.{kind}")
+
+    def completed(self):
+        done = set()
+        for name in os.listdir(self.directory):
+            match = self._pattern.match(name)
+            if match:
+                done.add(int(match.group(1)))
+        return done
+
+    def save(self, network_id, samples):
+        # hidden temporary name, like TrainingDatasetWriter, so listings and merges skip it
+        target = self.path(network_id, 'csv' if samples else 'skip')
+        tmp = os.path.join(self.directory, '.' + os.path.basename(target) + '.tmp')
+        if samples:
+            import pandas as pd
+            pd.DataFrame(samples).to_csv(tmp, index=False)
+        else:
+            open(tmp, 'w').close()
+        # rename last so an interrupted write never looks completed
+        os.replace(tmp, target)
+
+    def load(self, network_ids=None):
+        import pandas as pd
+        if network_ids is None:
+            network_ids = self.completed()
+        frames = []
+        for network_id in sorted(network_ids):
+            path = self.path(network_id, 'csv')
+            if os.path.exists(path):
+                frames.append(pd.read_csv(path, float_precision='round_trip'))
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,109 @@
+import os
+import re
+
+# Columns stored as int32; node_id is a string and everything else float32.
+INT32_COLUMNS = (
+    'network_id', 'ranking', 'module_size', 'number_of_modules', 'mean_degree',
+    'degree', 'num_nodes', 'min_dist_to_selected',
+)
+STRING_COLUMNS = ('node_id',)
+
+
+def training_schema(columns):
+    import pyarrow as pa
+    fields = []
+    for col in columns:
+        if col in STRING_COLUMNS:
+            fields.append(pa.field(col, pa.string()))
+        elif col in INT32_COLUMNS:
+            fields.append(pa.field(col, pa.int32()))
+        else:
+            fields.append(pa.field(col, pa.float32()))
+    return pa.schema(fields)
+
+
+# ========== Streaming Parquet writer ==========
+class TrainingDatasetWriter:
+    """Partitioned Parquet dataset written one network at a time.
+
+    Rows of network `i` go to `<root>/block=<i // block_size>/network_<i>.parquet`
+    (zero-padded, so file order is network_id order), memory only ever holds
+    one network and the dataset can be read back with pyarrow.dataset or
+    `load_training_data`. Rejected networks get an empty `_network_<i>.skip`
+    marker, which pyarrow ignores like the `.`-prefixed temporary files.
+    Same `completed`/`save` interface as `NetworkCheckpoint`, so it doubles
+    as the checkpoint of a resumable run.
+    """
+
+    _pattern = re.compile(r'^_?network_(\d+)\.(parquet|skip)$')
+
+    def __init__(self, root, block_size=50):
+        self.root = root
+        self.block_size = block_size
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, network_id, kind='parquet'):
+        block = os.path.join(self.root, f"block={network_id // self.block_size:04d}")
+        prefix = '_' if kind == 'skip' else ''
+        return os.path.join(block, f"{prefix}network_{network_id:06d}.{kind}")
+
+    def completed(self):
+        done = set()
+        for _, _, files in os.walk(self.root):
+            for name in files:
+                match = self._pattern.match(name)
+                if match:
+                    done.add(int(match.group(1)))
+        return done
+
+    def save(self, network_id, samples):
+        target = self.path(network_id, 'parquet' if samples else 'skip')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(target), '.' + os.path.basename(target) + '.tmp')
+        if samples:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pylist(samples, schema=training_schema(samples[0].keys()))
+            pq.write_table(table, tmp, compression='zstd')
+        else:
+            open(tmp, 'w').close()
+        os.replace(tmp, target)
+
+
+# ========== Loading ==========
+def _is_parquet(path):
+    return path.endswith('.parquet') or os.path.isdir(path)
+
+
+def _parquet_dataset(path):
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format='parquet', partitioning='hive')
+
+
+def dataset_columns(path):
+    if _is_parquet(path):
+        # the hive `block` key is a storage detail, not a training column
+        return [col for col in _parquet_dataset(path).schema.names if col != 'block']
+    import pandas as pd
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def load_training_data(path, columns=None, exclude=None):
+    """Read only `columns` (minus `exclude`) from a Parquet dataset or CSV.
+
+    Parquet columns keep their float32/int32 types and are converted with
+    `split_blocks`/`self_destruct`, so numeric columns are not copied twice.
+    """
+    if columns is None and (exclude or _is_parquet(path)):
+        columns = dataset_columns(path)
+    if columns is not None and exclude:
+        columns = [col for col in columns if col not in exclude]
+
+    if _is_parquet(path):
+        table = _parquet_dataset(path).to_table(columns=columns)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    import pandas as pd
+    df = pd.read_csv(path, usecols=columns)
+    # usecols keeps file order; return the requested order like df[columns]
+    return df if columns is None else df[columns]
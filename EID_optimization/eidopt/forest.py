@@ -0,0 +1,124 @@
+import json
+import os
+
+import numpy as np
+
+_ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots')
+
+
+# ========== Export ==========
+def export_forest(model, directory):
+    """Write a fitted forest regressor as flat arrays, one `.npy` per field.
+
+    All trees are concatenated: `left`/`right` hold global node ids (-1 at
+    leaves) and `roots` the first node of every tree. The files are plain
+    uncompressed `.npy`, so `CompactForest.load` can memory-map them and
+    every process that loads the same directory shares one copy in the page
+    cache instead of unpickling its own forest.
+    """
+    trees = [est.tree_ for est in model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    index_type = np.int32 if sizes.sum() < 2**31 else np.int64
+
+    def children(attr):
+        out = []
+        for tree, root in zip(trees, roots):
+            child = getattr(tree, attr).astype(index_type)
+            out.append(np.where(child >= 0, child + root, -1).astype(index_type))
+        return np.concatenate(out)
+
+    arrays = {
+        'feature': np.concatenate([tree.feature for tree in trees]).astype(np.int32),
+        'threshold': np.concatenate([tree.threshold for tree in trees]),
+        'left': children('children_left'),
+        'right': children('children_right'),
+        # sklearn < 1.3 has no missing-value support; NaN then goes right
+        'missing_left': np.concatenate([getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, np.uint8))
+                                        for tree in trees]).astype(np.uint8),
+        'value': np.concatenate([tree.value[:, :, 0] for tree in trees]),
+        'roots': roots.astype(np.int64),
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(array))
+    meta = {
+        'feature_names': [str(f) for f in getattr(model, 'feature_names_in_', [])] or None,
+        'n_features': int(model.n_features_in_),
+        'n_outputs': int(model.n_outputs_),
+    }
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return directory
+
+
+# ========== Prediction ==========
+class CompactForest:
+    """Vectorized predictor over the arrays written by `export_forest`.
+
+    `predict` walks all trees for a block of rows at once, one tree level
+    per step, and adds the tree outputs in estimator order before dividing
+    by the number of trees. That is the arithmetic of
+    `RandomForestRegressor.predict` with `n_jobs=1` (inputs cast to float32,
+    `x <= threshold` in double, NaN routed by `missing_go_to_left`), so the
+    outputs are bit-identical to it.
+    """
+
+    def __init__(self, arrays, meta):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.n_features_in_ = meta['n_features']
+        self.n_outputs_ = meta['n_outputs']
+        if meta.get('feature_names'):
+            self.feature_names_in_ = np.array(meta['feature_names'], dtype=object)
+        self.n_estimators = len(self.roots)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mode) for name in _ARRAYS}
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(arrays, meta)
+
+    def _leaves(self, X):
+        # (n_trees, n_rows) leaf ids; `pending` holds the flat (tree, row)
+        # positions not yet at a leaf and shrinks every level
+        n_rows = X.shape[0]
+        node = np.repeat(np.asarray(self.roots)[:, None], n_rows, axis=1).ravel()
+        pending = np.arange(node.size)
+        while pending.size:
+            current = node[pending]
+            left = self.left[current]
+            inner = left != -1
+            pending, current, left = pending[inner], current[inner], left[inner]
+            x = X[pending % n_rows, self.feature[current]]
+            go_left = x <= self.threshold[current]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left[missing] = self.missing_left[current[missing]] == 1
+            node[pending] = np.where(go_left, left, self.right[current])
+        return node.reshape(-1, n_rows)
+
+    def predict(self, X, block_rows=None):
+        if hasattr(X, 'columns') and hasattr(self, 'feature_names_in_'):
+            names = list(self.feature_names_in_)
+            if list(X.columns) != names:
+                X = X[names]
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, the forest expects {self.n_features_in_}")
+        if block_rows is None:
+            # keep the (n_trees, rows) node matrix around a few million entries
+            block_rows = max(1, 4_000_000 // self.n_estimators)
+
+        out = np.zeros((X.shape[0], self.n_outputs_))
+        for start in range(0, X.shape[0], block_rows):
+            stop = min(start + block_rows, X.shape[0])
+            leaves = self._leaves(X[start:stop])
+            block = out[start:stop]
+            for tree_leaves in leaves:
+                block += self.value[tree_leaves]
+        out /= self.n_estimators
+        return out[:, 0] if self.n_outputs_ == 1 else out
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+_ARRAYS = ('indptr', 'indices', 'labels')
+
+
+# ========== Largest component of a GML file ==========
+def largest_component(G):
+    """Largest connected component as a copy that keeps the node order of G.
+
+    Nodes outside it are removed from a copy instead of taking a subgraph
+    of a node set, whose node order would follow set iteration (and so
+    string hashing).
+    """
+    import networkx as nx
+    if G.number_of_nodes() == 0 or nx.is_connected(G):
+        return G.copy()
+    largest_cc = max(nx.connected_components(G), key=len)
+    G = G.copy()
+    G.remove_nodes_from([v for v in list(G) if v not in largest_cc])
+    return G
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_version(G, directory, digest, meta):
+    # one row per node in node order, neighbours in adjacency order, so
+    # rebuilding with add_edges_from gives back the same graph (see load_gml)
+    labels = list(G.nodes())
+    index = {v: i for i, v in enumerate(labels)}
+    indptr = np.zeros(len(labels) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(G.adj[v]) for v in labels])
+    indices = np.array([index[u] for v in labels for u in G.adj[v]], dtype=np.int32)
+    arrays = {'indptr': indptr, 'indices': indices, 'labels': np.array([str(v) for v in labels])}
+
+    # versions are named by content and never rewritten: a private temporary
+    # directory is renamed into place, and if another process got there first
+    # its (identical) version is kept and ours is dropped
+    version = os.path.join(directory, digest)
+    tmp = os.path.join(directory, f".tmp-{os.getpid()}-{uuid.uuid4().hex}")
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + '.npy'), array)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({**meta, 'graph': G.graph}, f)
+    try:
+        os.rename(tmp, version)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(version, 'meta.json')):
+            raise
+    return version
+
+
+def _write_pointer(directory, pointer):
+    # the current version is switched by atomically replacing a small file
+    tmp = os.path.join(directory, f".current-{os.getpid()}-{uuid.uuid4().hex}.json")
+    with open(tmp, 'w') as f:
+        json.dump(pointer, f)
+    os.replace(tmp, os.path.join(directory, 'current.json'))
+
+
+def _read_pointer(directory):
+    try:
+        with open(os.path.join(directory, 'current.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def gml_csr(path, cache_dir=None, mmap=True):
+    """(indptr, indices, labels, meta) of the largest component of a GML file.
+
+    The file is parsed once; the component is stored as CSR arrays plus a
+    label array under `cache_dir` (default: `.gml_cache` next to the file)
+    and memory-mapped on later calls. The cache is used while the file's
+    size and mtime are unchanged, or, when they changed, while its SHA-256
+    is; otherwise it is rebuilt. Node labels come back as strings, as
+    `nx.read_gml` gives them; node and edge attributes are not cached.
+
+    Each build is a new directory named by the file's SHA-256, published
+    with a rename, and `current.json` points at the version in use, so
+    processes can build and read the cache concurrently without seeing a
+    partial one. Versions of older file contents are left in place for
+    readers that may still map them.
+    """
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), '.gml_cache')
+    directory = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(directory, exist_ok=True)
+    stat = os.stat(path)
+    key = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    pointer = _read_pointer(directory)
+    digest = pointer.get('sha256') if pointer else None
+    if pointer is None or any(pointer.get(k) != v for k, v in key.items()):
+        digest = _file_hash(path)  # touched or copied files keep their version
+    version = os.path.join(directory, digest)
+    if not os.path.exists(os.path.join(version, 'meta.json')):
+        import networkx as nx
+        version = _write_version(largest_component(nx.read_gml(path)), directory, digest,
+                                 {'sha256': digest, 'source': path})
+    if pointer != {**key, 'sha256': digest}:
+        _write_pointer(directory, {**key, 'sha256': digest})
+
+    with open(os.path.join(version, 'meta.json')) as f:
+        meta = {**json.load(f), **key}
+    mode = 'r' if mmap else None
+    indptr, indices, labels = (np.load(os.path.join(version, name + '.npy'), mmap_mode=mode)
+                               for name in _ARRAYS)
+    return indptr, indices, labels, meta
+
+
+def load_gml(path, cache_dir=None):
+    """Largest connected component of a GML file as an nx.Graph, through the `gml_csr` cache.
+
+    Equal to `largest_component(nx.read_gml(path))`, with the same node and
+    adjacency order, minus node and edge attributes.
+    """
+    import networkx as nx
+
+    indptr, indices, labels, meta = gml_csr(path, cache_dir)
+    labels = labels.tolist()
+    G = nx.Graph()
+    G.graph.update(meta.get('graph', {}))
+    G.add_nodes_from(labels)
+    indices = np.asarray(indices).tolist()
+    G.add_edges_from((labels[i], labels[j])
+                     for i in range(len(labels)) for j in indices[indptr[i]:indptr[i + 1]])
+    return G
@@ -0,0 +1,92 @@
+import math
+import random
+
+import numpy as np
+
+
+# ========== Greedy Selection ==========
+def select_node_outbreak(p, n):
+    return random.choices(n, weights=p, k=1)[0]
+
+
+def default_tau(G):
+    # transmission rate scaled to the network's epidemic threshold
+    degrees = [d for _, d in G.degree()]
+    k_mean = sum(degrees) / len(degrees)
+    k2_mean = sum(d**2 for d in degrees) / len(degrees)
+    return 3.0 / ((k2_mean - k_mean) / k_mean)
+
+
+def greedy_max_influence(G, node, probabilities, rounds=None, simulations=1000, tau=None, gamma=1.,
+                         rng=None, fraction=None, gain_tol=None):
+    """Return {node: step} for the first `rounds` greedy picks.
+
+    `tau=None` uses `default_tau(G)`; the 06 baselines pass `tau=0.5`.
+    `rng` is handed to EoN (>= 2.0), which otherwise draws from a fresh,
+    unseeded generator on every simulation.
+    Partial ranking: `fraction` caps the rounds at ceil(fraction * len(node)),
+    and `gain_tol` stops as soon as the best candidate improves the objective
+    by less than `gain_tol`. Use `tie_unranked` to label the remaining nodes.
+    """
+    import EoN
+
+    if rounds is None:
+        rounds = len(G.nodes())
+    if fraction is not None:
+        rounds = min(rounds, math.ceil(fraction * len(node)))
+    if tau is None:
+        tau = default_tau(G)
+    sim_kwargs = {} if rng is None else {'rng': rng}
+    best = []
+    available_nodes = set(node)
+    node_rankings = {}
+    best_gain = 0.
+
+    for step in range(rounds):
+        if not available_nodes:
+            break
+
+        # keep `node` order so ties break the same way in every worker process
+        candidates = [best + [x] for x in node if x in available_nodes]
+        mean_gains = np.zeros(len(candidates))
+
+        for _ in range(simulations):
+            selected_node = select_node_outbreak(probabilities, node)
+            sim = EoN.Gillespie_SIR(G, tau=tau, gamma=gamma, initial_infecteds=selected_node, return_full_data=True,
+                                    **sim_kwargs)
+            b, c = list(sim.t()), sim.I() + sim.R()
+
+            for i, candidate in enumerate(candidates):
+                g_max = 0
+                for s in candidate:
+                    m1 = sim.node_history(s)
+                    if len(m1[0]) == 3:
+                        g1 = c[-1] - c[b.index(m1[0][1])]
+                    elif len(m1[0]) == 2:
+                        g1 = c[-1] - c[0]
+                    else:
+                        g1 = 0
+                    g_max = max(g_max, g1)
+                mean_gains[i] += g_max
+
+        mean_gains /= simulations
+        best_idx = np.argmax(mean_gains)
+        # the first pick is always kept; later ones must add at least gain_tol
+        if gain_tol is not None and step > 0 and mean_gains[best_idx] - best_gain < gain_tol:
+            break
+        best_gain = mean_gains[best_idx]
+        best = candidates[best_idx]
+
+        selected_node = best[-1]
+        node_rankings[selected_node] = step
+        available_nodes.remove(selected_node)
+
+    return node_rankings
+
+
+def tie_unranked(node_rankings, node):
+    # nodes the partial ranking did not reach share rank len(node), the
+    # bottom of a full ranking, so however early gain_tol stopped they stay
+    # above any top-k threshold (04 clips ranks at a fraction of the network)
+    tail_rank = len(node)
+    return {n: node_rankings.get(n, tail_rank) for n in node}
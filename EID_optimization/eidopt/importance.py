@@ -0,0 +1,104 @@
+import copy
+
+import numpy as np
+
+
+# ========== Batched permutation importance ==========
+def _r2(y_true, y_pred):
+    # sklearn's default regressor score, without the input validation per call
+    resid = np.sum((y_true - y_pred) ** 2)
+    total = np.sum((y_true - y_true.mean()) ** 2)
+    return 1 - resid / total if total else 0.0
+
+
+def _float32_input(model):
+    # sklearn trees and forests (and CompactForest) cast X to float32 before
+    # thresholding, so a float32 copy predicts exactly like the original;
+    # other estimators, e.g. HistGradientBoostingRegressor's binning, do not
+    from .forest import CompactForest
+    if isinstance(model, CompactForest) or hasattr(model, 'tree_'):
+        return True
+    estimators = getattr(model, 'estimators_', None)
+    return (isinstance(estimators, list) and len(estimators) > 0
+            and all(hasattr(est, 'tree_') for est in estimators))
+
+
+def _predict(model, X, names):
+    if names is not None and hasattr(model, 'feature_names_in_'):
+        # a no-copy frame, so sklearn does not warn about missing feature names
+        import pandas as pd
+        X = pd.DataFrame(X, columns=names, copy=False)
+    return model.predict(X)
+
+
+def _run_jobs(model, X, y, jobs, metric, stack, names):
+    # One buffer of `stack` stacked copies of X per worker. Only the permuted
+    # columns are written before a predict and restored after it, so X is
+    # never copied again.
+    n = X.shape[0]
+    buffer = np.tile(X, (min(stack, len(jobs)), 1))
+    out = []
+    for start in range(0, len(jobs), stack):
+        chunk = jobs[start:start + stack]
+        for i, (_, cols, seed) in enumerate(chunk):
+            rng = np.random.RandomState(seed)
+            block = buffer[i * n:(i + 1) * n]
+            for col in cols:
+                block[:, col] = X[rng.permutation(n), col]
+        pred = _predict(model, buffer[:len(chunk) * n], names)
+        for i, (key, cols, _) in enumerate(chunk):
+            out.append((key, metric(y, pred[i * n:(i + 1) * n])))
+            buffer[i * n:(i + 1) * n, cols] = X[:, cols]
+    return out
+
+
+def permutation_importance_batched(model, X, y, column_groups, metric=None, n_repeats=50,
+                                   random_state=42, stack=8, n_jobs=1):
+    """Permutation importance of groups of columns: baseline score minus permuted score.
+
+    `column_groups` maps a name to a list of columns (names if X is a
+    DataFrame, else positions); each column of a group gets its own row
+    permutation, as in a per-feature loop. X is converted once to one array,
+    float32 for tree forests (what their trees use internally, so
+    predictions are unchanged) and float64 for any other model, the
+    baseline prediction is shared, and `stack` permuted copies go through
+    one `model.predict` call. Jobs are split over `n_jobs` threads, each
+    running a single-threaded shallow copy of the model. Permutations are
+    seeded per (group, repeat), so results do not depend on `stack` or
+    `n_jobs`. `metric(y_true, y_pred)` defaults to R^2.
+
+    Returns (baseline_score, {name: array of n_repeats importances}).
+    """
+    from joblib import Parallel, delayed, effective_n_jobs
+
+    if metric is None:
+        metric = _r2
+    names = list(X.columns) if hasattr(X, 'columns') else None
+    X = np.ascontiguousarray(X, dtype=np.float32 if _float32_input(model) else np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    baseline = metric(y, _predict(model, X, names))
+
+    rng = np.random.RandomState(random_state)
+    seeds = rng.randint(2**31 - 1, size=(len(column_groups), n_repeats))
+    jobs = []
+    for g, (key, cols) in enumerate(column_groups.items()):
+        cols = [names.index(c) if names is not None and not isinstance(c, (int, np.integer)) else c
+                for c in cols]
+        jobs.extend((key, cols, seed) for seed in seeds[g])
+
+    n_workers = max(1, min(effective_n_jobs(n_jobs), -(-len(jobs) // stack)))
+    if n_workers > 1 and hasattr(model, 'n_jobs'):
+        model = copy.copy(model)  # shares the fitted trees
+        model.n_jobs = 1
+    # contiguous slices, so each worker fills its stacks from consecutive jobs
+    bounds = np.linspace(0, len(jobs), n_workers + 1).astype(int)
+    results = Parallel(n_jobs=n_workers, prefer='threads')(
+        delayed(_run_jobs)(model, X, y, jobs[lo:hi], metric, stack, names)
+        for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+    )
+
+    importances = {key: [] for key in column_groups}
+    for part in results:
+        for key, score in part:
+            importances[key].append(baseline - score)
+    return baseline, {key: np.asarray(values) for key, values in importances.items()}
@@ -0,0 +1,202 @@
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ========== Shared job table ==========
+class JobTable:
+    """SQLite table of network ids shared by any number of workers.
+
+    Put the file on a filesystem every host can reach. Claims run inside
+    `BEGIN IMMEDIATE`, so two workers never get the same pending job. A
+    running job whose heartbeat is older than `lease_seconds` is treated as
+    abandoned and handed out again. SQLite locking needs a filesystem with
+    working POSIX locks (SMB/CIFS and most NFSv4 setups are fine; NFSv3
+    without lockd is not).
+    """
+
+    def __init__(self, path, lease_seconds=600):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " network_id INTEGER PRIMARY KEY,"
+                " cost REAL NOT NULL DEFAULT 0,"
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                " worker TEXT,"
+                " heartbeat REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " n_rows INTEGER)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 60000")
+        return conn
+
+    def add(self, network_ids, costs=None):
+        if costs is None:
+            costs = [0] * len(network_ids)
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (network_id, cost) VALUES (?, ?)",
+                [(int(i), float(c)) for i, c in zip(network_ids, costs)]
+            )
+
+    def mark_done(self, network_ids):
+        # networks finished before the table existed (e.g. in an existing checkpoint)
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE jobs SET status = 'done' WHERE network_id = ?",
+                [(int(i),) for i in network_ids]
+            )
+
+    def claim(self, worker_id):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT network_id FROM jobs"
+                " WHERE status = 'pending' OR (status = 'running' AND heartbeat < ?)"
+                " ORDER BY cost DESC, network_id LIMIT 1",
+                (now - self.lease_seconds,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, attempts = attempts + 1"
+                " WHERE network_id = ?",
+                (worker_id, now, row[0])
+            )
+            conn.execute("COMMIT")
+            return row[0]
+        except Exception:
+            # BEGIN itself may have failed, or SQLite may already have rolled back
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, worker_id, network_id):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE network_id = ? AND worker = ? AND status = 'running'",
+                (time.time(), network_id, worker_id)
+            )
+
+    def complete(self, worker_id, network_id, n_rows):
+        # a job that was reclaimed and finished by someone else stays theirs
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', n_rows = ?, heartbeat = ?"
+                " WHERE network_id = ? AND worker = ? AND status = 'running'",
+                (n_rows, time.time(), network_id, worker_id)
+            )
+            return cur.rowcount == 1
+
+    def release(self, worker_id, network_id):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', worker = NULL"
+                " WHERE network_id = ? AND worker = ? AND status = 'running'",
+                (network_id, worker_id)
+            )
+
+    def counts(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def done_ids(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT network_id FROM jobs WHERE status = 'done'").fetchall()
+        return {row[0] for row in rows}
+
+
+@contextmanager
+def heartbeat(table, worker_id, network_id, interval=None):
+    # keep the lease alive from a background thread while the job runs
+    if interval is None:
+        interval = table.lease_seconds / 4
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                table.heartbeat(worker_id, network_id)
+            except sqlite3.OperationalError:
+                pass
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def drain(table, function, worker_id=None, poll_seconds=None):
+    """Claim and run jobs until none are left; returns the ids this worker completed.
+
+    `function(network_id)` does the work and returns the number of rows written.
+    With `poll_seconds` set the worker waits for running jobs of other
+    workers to finish or expire instead of exiting as soon as nothing is pending.
+    """
+    if worker_id is None:
+        worker_id = default_worker_id()
+    completed = []
+    while True:
+        network_id = table.claim(worker_id)
+        if network_id is None:
+            if poll_seconds and table.counts().get('running', 0) > 0:
+                time.sleep(poll_seconds)
+                continue
+            return completed
+        try:
+            with heartbeat(table, worker_id, network_id):
+                n_rows = function(network_id)
+        except BaseException:
+            table.release(worker_id, network_id)
+            raise
+        if table.complete(worker_id, network_id, n_rows):
+            completed.append(network_id)
+
+
+# ========== Merging ==========
+def merge_outputs(sources, target):
+    """Copy per-network files from host-local output directories into `target`.
+
+    Works for both `NetworkCheckpoint` and `TrainingDatasetWriter` layouts;
+    a network already present in `target` is not copied again.
+    """
+    copied = 0
+    for source in sources:
+        for dirpath, _, files in os.walk(source):
+            rel = os.path.relpath(dirpath, source)
+            for name in files:
+                # partial writes of killed workers (hidden or *.tmp) are never merged
+                if name.startswith('.') or name.endswith('.tmp'):
+                    continue
+                dst_dir = os.path.join(target, rel)
+                dst = os.path.join(dst_dir, name)
+                if os.path.exists(dst):
+                    continue
+                os.makedirs(dst_dir, exist_ok=True)
+                tmp = os.path.join(dst_dir, '.' + name + '.tmp')
+                shutil.copy2(os.path.join(dirpath, name), tmp)
+                os.replace(tmp, dst)
+                copied += 1
+    return copied
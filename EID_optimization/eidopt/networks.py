@@ -0,0 +1,120 @@
+import numpy as np
+import numpy.random as rdm
+
+
+# ========== Network Generation Functions ==========
+def heterogeneous_dist(ID_list, mean_degree, heterogeneity):
+    # intiate with all nodes having mean degree
+    degree = {}
+    for ID in ID_list:
+        degree[ID] = mean_degree
+
+    # iterate until heterogeneity is achieved
+    while np.std([degree[ID] for ID in ID_list]) < heterogeneity:
+        # choose a node at random
+        source_list = [ID for ID in ID_list if degree[ID] > 1]
+        if not source_list:
+            break
+        random_node = source_list[int(rdm.random() * len(source_list))]
+
+        # select a node with probability proportional to its degree
+        r = rdm.random() * len(ID_list) * mean_degree
+
+        k = 0
+        target_node = ID_list[k]
+        slide = degree[target_node]
+        while slide < r and k < len(ID_list) - 1:
+            k = k + 1
+            target_node = ID_list[k]
+            slide = slide + degree[target_node]
+
+        # remove the stub from the random node and attach to the target
+        degree[random_node] -= 1
+        degree[target_node] += 1
+
+    return degree
+
+
+def connect_stubs(stubs, edge_list):
+    stubs = [(s[0], s[1]) for s in rdm.permutation(stubs)]
+
+    if len(stubs) < 2:
+        no_more_edges = True
+    else:
+        no_more_edges = False
+
+    while no_more_edges == False:
+        if not stubs:
+            break
+        source = stubs.pop(0)
+
+        found = False
+        stubs_to_check = len(stubs)
+
+        while found == False and no_more_edges == False:
+            if not stubs:
+                no_more_edges = True
+                break
+            target = stubs.pop(0)
+
+            # order the edge so that the reverse one dosen't get put in
+            new_edge = sorted([source, target])
+            if new_edge in edge_list or source == target:
+                stubs.append(target)
+            else:
+                edge_list.append(new_edge)
+                found = True
+
+            stubs_to_check = stubs_to_check - 1
+            if stubs_to_check < 2:
+                no_more_edges = True
+
+    return edge_list
+
+
+def modular_config_model(module_size, number_of_modules, p, heterogeneity, mean_degree):
+    ID_list = []
+    # create list of IDs according to the (module,number) naming convention
+    for m in range(number_of_modules):
+        for n in range(module_size):
+            node_ID = (m, n)
+            ID_list.append(node_ID)
+
+    degree = heterogeneous_dist(ID_list, mean_degree, heterogeneity)
+
+    edge_list = []
+    # these are the stubs that connect together across modules
+    inter_stubs = []
+
+    for m in range(number_of_modules):
+        intra_stubs = []
+        for n in range(module_size):
+            for i in range(degree[(m, n)]):
+                r = rdm.random()
+                if r < p:
+                    intra_stubs.append((m, n))
+                else:
+                    inter_stubs.append((m, n))
+
+        new_edges = connect_stubs(intra_stubs, edge_list)
+        edge_list = edge_list + new_edges
+
+    new_edges = connect_stubs(inter_stubs, edge_list)
+    edge_list = edge_list + new_edges
+
+    return ID_list, edge_list
+
+
+def network_generator(module_size, number_of_modules, p, heterogeneity, mean_degree):
+    ID = []
+    edge = []
+    ID2, edge2 = modular_config_model(module_size, number_of_modules, p, heterogeneity, mean_degree)
+    for i in ID2:
+        ID.append(str(i))
+    for i in edge2:
+        x = []
+        for j in i:
+            j = tuple(map(int, j))
+            x.append(str(j))
+        edge.append(x)
+    return ID, edge
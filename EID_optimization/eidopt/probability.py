@@ -0,0 +1,32 @@
+import numpy as np
+import networkx as nx
+
+
+# ========== Emergence probability generation functions ==========
+def unique_ranks(data):
+    indexed_data = [(value, index) for index, value in enumerate(data)]
+    sorted_data = sorted(indexed_data, key=lambda x: x[0])
+    ranks = [0] * len(data)
+    for rank, (_, original_index) in enumerate(sorted_data):
+        ranks[original_index] = rank
+    return ranks
+
+
+def probability_generate(G, alpha, beta, corr, s):
+    probabilities = list(np.random.beta(alpha, beta, s))
+    importance = [t[1] for t in nx.algorithms.centrality.degree_centrality(G).items()]
+    nodes = list(G.nodes)
+    mean = [0, 0]
+    cov = [[1, corr], [corr, 1]]
+    samples = np.random.multivariate_normal(mean, cov, s)
+    x_samples = list(samples[:, 0])
+    y_samples = list(samples[:, 1])
+    rank_importance = unique_ranks(importance)
+    probability_ranked = []
+    for i in rank_importance:
+        xt = sorted(x_samples)[i]
+        index_x = x_samples.index(xt)
+        yt = y_samples[index_x]
+        index_y = sorted(y_samples).index(yt)
+        probability_ranked.append(sorted(probabilities)[index_y])
+    return probability_ranked, nodes
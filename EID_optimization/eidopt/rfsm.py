@@ -0,0 +1,237 @@
+import os
+
+import numpy as np
+
+# Columns of 02's extract_node_features that depend on the already selected nodes
+DYNAMIC_FEATURES = (
+    'neighbor_selected_ratio', 'synergy_score', 'redundancy_score',
+    'new_coverage_ratio', 'overlap_coverage_ratio', 'min_dist_to_selected',
+)
+
+
+def _adjacency(G, nodes):
+    import networkx as nx
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format='csr')
+    A.setdiag(0)  # self-loops are not neighbours for the coverage features
+    A.eliminate_zeros()
+    return A
+
+
+# ========== Static node features ==========
+def static_node_features(G, probabilities, chunk_size=512):
+    """All selection-independent columns of 02's `extract_node_features`, for every node.
+
+    Returns (nodes, {column: array}) with rows in `G.nodes()` order;
+    `probabilities` must follow the same order. Shortest paths (for
+    `prob_weighted_distance` and `avg_path_length`) come from scipy BFS in
+    row chunks of `chunk_size`, instead of one networkx BFS per node and
+    feature row.
+    """
+    import networkx as nx
+    from scipy import stats
+    from scipy.sparse import csgraph
+
+    nodes = list(G.nodes())
+    n = len(nodes)
+    p = np.asarray(probabilities, dtype=np.float64)
+    A = _adjacency(G, nodes)
+    deg = np.array([d for _, d in G.degree()], dtype=np.float64)
+    clustering = nx.clustering(G)
+    clust = np.array([clustering[v] for v in nodes])
+    triangles = nx.triangles(G)
+    tri = np.array([triangles[v] for v in nodes], dtype=np.float64)
+
+    # one pass of BFS rows for weighted closeness and the average path length
+    _, labels = csgraph.connected_components(A, directed=False)
+    largest = np.bincount(labels).argmax()
+    in_lcc = labels == largest
+    weighted_closeness = np.zeros(n)
+    path_sum = 0.0
+    for start in range(0, n, chunk_size):
+        rows = np.arange(start, min(start + chunk_size, n))
+        D = csgraph.shortest_path(A, directed=False, unweighted=True, indices=rows)
+        reach = np.isfinite(D)
+        reach[np.arange(len(rows)), rows] = False
+        total = reach @ p
+        weighted = np.where(reach, p / np.where(reach, D + 1, 1), 0).sum(axis=1)
+        weighted_closeness[rows] = np.divide(weighted, total, out=np.zeros(len(rows)), where=total > 0)
+        lcc_rows = in_lcc[rows]
+        path_sum += D[lcc_rows][:, in_lcc].sum()
+    n_lcc = in_lcc.sum()
+    avg_path_length = path_sum / (n_lcc * (n_lcc - 1)) if n_lcc > 1 else 0
+
+    try:
+        betweenness = nx.betweenness_centrality(G)
+        eigenvector = nx.eigenvector_centrality(G, max_iter=1000)
+        betweenness = np.array([betweenness[v] for v in nodes])
+        eigenvector = np.array([eigenvector[v] for v in nodes])
+    except Exception:
+        betweenness = eigenvector = weighted_closeness = np.full(n, np.nan)
+
+    safe_deg = np.where(deg > 0, deg, 1)
+    nb_deg = (A @ deg) / safe_deg
+    nb_prob = (A @ p) / safe_deg
+    nb_prob_sq = (A @ (p * p)) / safe_deg
+
+    features = {
+        'degree': deg,
+        'probability': p,
+        'prob_mean': np.mean(p),
+        'prob_std': np.std(p),
+        'prob_skewness': stats.skew(p),
+        'prob_kurtosis': stats.kurtosis(p),
+        'num_nodes': n,
+        'density': nx.density(G),
+        'avg_clustering': clust.mean(),
+        'avg_degree': deg.mean(),
+        'degree_variance': deg.var(),
+        'degree_skewness': stats.skew(deg),
+        'degree_kurtosis': stats.kurtosis(deg),
+        'avg_path_length': avg_path_length,
+        'betweenness_centrality': betweenness,
+        'eigenvector_centrality': eigenvector,
+        'prob_weighted_distance': weighted_closeness,
+        'clustering_coeff': clust,
+        # ego network has deg + triangles edges among deg + 1 nodes
+        'local_density': np.where(deg > 0, 2 * (deg + tri) / ((deg + 1) * safe_deg), 0),
+        'avg_neighbor_degree': np.where(deg > 0, nb_deg, 0),
+        'avg_neighbor_prob': np.where(deg > 0, nb_prob, 0),
+        'std_neighbor_prob': np.where(deg > 0, np.sqrt(np.maximum(nb_prob_sq - nb_prob ** 2, 0)), 0),
+        'prob_weighted_degree': deg * p,
+        'prob_weighted_clustering': clust * p,
+        'degree_centrality': deg / (n - 1) if n > 1 else np.zeros(n),
+    }
+    return nodes, {name: np.broadcast_to(value, n) for name, value in features.items()}
+
+
+def graph_network_params(G, communities=None):
+    """Estimates of 02's generator parameters for a graph that was not generated.
+
+    Modules are the greedy-modularity communities (unless given), `p` is the
+    share of edges inside a module and `heterogeneity` the degree std.
+    alpha/beta/corr belong to the probability model and are not estimated.
+    """
+    import networkx as nx
+    if communities is None:
+        communities = nx.community.greedy_modularity_communities(G)
+    module_of = {v: i for i, community in enumerate(communities) for v in community}
+    m = G.number_of_edges()
+    intra = sum(1 for u, v in G.edges() if module_of[u] == module_of[v])
+    degrees = np.array([d for _, d in G.degree()])
+    return {
+        'module_size': G.number_of_nodes() / len(communities),
+        'number_of_modules': len(communities),
+        'p': intra / m if m else 0,
+        'heterogeneity': degrees.std(),
+        'mean_degree': degrees.mean(),
+    }
+
+
+# ========== Sentinel selection ==========
+class RFSMSelector:
+    """Pick sentinels with a trained RFSM surrogate (04's `rank_rf_bayes.pkl` or `rank_rf_compact`).
+
+    Static features are computed once per graph; after each pick only the
+    selection-dynamics columns are updated, from one BFS out of the new
+    sentinel and its neighbourhood, and all remaining candidates are
+    re-predicted in one call. The candidate with the lowest predicted rank
+    is picked (ties go to the earlier node). Columns the graph cannot
+    provide, like the generator parameters, come from `network_params`.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.feature_names = list(model.feature_names_in_)
+
+    @classmethod
+    def load(cls, path):
+        # a directory is a forest written by eidopt.forest.export_forest
+        if os.path.isdir(path):
+            from .forest import CompactForest
+            return cls(CompactForest.load(path))
+        import joblib
+        return cls(joblib.load(path))
+
+    def _predict(self, X):
+        import pandas as pd
+        return self.model.predict(pd.DataFrame(X, columns=self.feature_names, copy=False))
+
+    def select(self, G, probabilities, k, network_params=None, static=None):
+        from scipy.sparse import csgraph
+
+        nodes, columns = static if static is not None else static_node_features(G, probabilities)
+        n = len(nodes)
+        k = min(k, n)
+        network_params = network_params or {}
+        A = _adjacency(G, nodes)
+        deg = np.asarray(columns['degree'], dtype=np.float64)
+
+        X = np.empty((n, len(self.feature_names)), dtype=np.float32)
+        dynamic = {}
+        missing = []
+        for j, name in enumerate(self.feature_names):
+            if name in DYNAMIC_FEATURES:
+                dynamic[name] = j
+            elif name in columns:
+                X[:, j] = columns[name]
+            elif name in network_params:
+                X[:, j] = network_params[name]
+            else:
+                missing.append(name)
+        if missing:
+            raise ValueError(f"no value for model features {missing}; pass them in network_params")
+
+        n_selected_nb = np.zeros(n)
+        synergy_sum = np.zeros(n)
+        synergy_count = np.zeros(n)
+        redundancy_sum = np.zeros(n)
+        redundancy_count = np.zeros(n)
+        min_dist = np.full(n, np.inf)
+        unreachable = np.zeros(n, dtype=bool)
+        covered = np.zeros(n, dtype=bool)
+        covered_count = np.zeros(n)  # |({v} + N(v)) & covered|
+        coverage_size = deg + 1
+
+        candidates = np.ones(n, dtype=bool)
+        selected = []
+        for step in range(k):
+            values = {
+                'neighbor_selected_ratio': np.divide(n_selected_nb, deg, out=np.zeros(n), where=deg > 0),
+                'synergy_score': np.divide(synergy_sum, synergy_count, out=np.zeros(n), where=synergy_count > 0),
+                'redundancy_score': np.divide(redundancy_sum, redundancy_count, out=np.zeros(n),
+                                              where=redundancy_count > 0),
+                'new_coverage_ratio': (coverage_size - covered_count) / coverage_size,
+                'overlap_coverage_ratio': covered_count / coverage_size,
+                # 02 falls back to 10 when nothing is selected or a selected node is unreachable
+                'min_dist_to_selected': np.where(np.isfinite(min_dist) & ~unreachable, min_dist, 10),
+            }
+            for name, j in dynamic.items():
+                X[:, j] = values[name]
+
+            idx = np.flatnonzero(candidates)
+            best = idx[np.argmin(self._predict(X[idx]))]
+            selected.append(nodes[best])
+            candidates[best] = False
+            if step == k - 1:
+                break
+
+            d = csgraph.shortest_path(A, directed=False, unweighted=True, indices=best)
+            reach = np.isfinite(d) & (d > 0)
+            far = reach & (d > 2)
+            near = reach & (d <= 2)
+            synergy_sum[far] += 1 / d[far]
+            synergy_count[far] += 1
+            redundancy_sum[near] += 1 / d[near]
+            redundancy_count[near] += 1
+            min_dist = np.minimum(min_dist, d)
+            unreachable |= ~np.isfinite(d)
+
+            neighbours = A.indices[A.indptr[best]:A.indptr[best + 1]]
+            n_selected_nb[neighbours] += 1
+            newly = np.append(neighbours, best)
+            newly = newly[~covered[newly]]
+            covered[newly] = True
+            covered_count[newly] += 1
+            np.add.at(covered_count, A[newly].indices, 1)
+
+        return selected
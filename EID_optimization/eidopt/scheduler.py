@@ -0,0 +1,26 @@
+def estimate_network_cost(module_size, number_of_modules, mean_degree, **_):
+    # Greedy labelling dominates: ~n rounds x n candidates, and each candidate
+    # is scored on simulations that touch the ~n * mean_degree edges of the network.
+    n = module_size * number_of_modules
+    return n * n * n * mean_degree
+
+
+def largest_first(tasks, costs):
+    order = sorted(range(len(tasks)), key=lambda i: costs[i], reverse=True)
+    return [tasks[i] for i in order]
+
+
+def run_largest_first(function, tasks, costs, n_jobs=4, prefer=None):
+    """Yield `function(*task)` results as they finish, most expensive task first.
+
+    One joblib pool serves the whole run. `pre_dispatch='n_jobs'` with
+    `batch_size=1` keeps the queue in the parent, so a worker takes the next
+    most expensive task as soon as it is free instead of waiting for a batch.
+    `prefer='threads'` shares the task arguments instead of pickling them.
+    """
+    from joblib import Parallel, delayed
+
+    ordered = largest_first(tasks, costs)
+    parallel = Parallel(n_jobs=n_jobs, batch_size=1, pre_dispatch='n_jobs',
+                        return_as='generator_unordered', prefer=prefer)
+    yield from parallel(delayed(function)(*task) for task in ordered)
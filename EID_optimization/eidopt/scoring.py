@@ -0,0 +1,132 @@
+import numpy as np
+
+
+# ========== Vectorized grouped NDCG ==========
+def _discount(positions):
+    # same expression as sklearn's _dcg_sample_scores
+    return 1 / (np.log(positions + 2) / np.log(2))
+
+
+class _GroupLayout:
+    # Per-subset work that does not depend on predictions: rows ordered by
+    # group, position-in-group discounts truncated at k, and the ideal DCG.
+
+    def __init__(self, codes, y_true, k_fraction):
+        self.order = np.argsort(codes, kind='stable')
+        self.codes = codes[self.order]
+        self.y_true = np.asarray(y_true, dtype=np.float64)[self.order]
+
+        is_start = np.empty(len(self.codes), dtype=bool)
+        is_start[:1] = True
+        is_start[1:] = self.codes[1:] != self.codes[:-1]
+        self.starts = np.flatnonzero(is_start)
+        sizes = np.diff(np.append(self.starts, len(self.codes)))
+        self.n_groups = len(sizes)
+        self.group_of_row = np.repeat(np.arange(self.n_groups), sizes)
+
+        ks = np.maximum(1, (k_fraction * sizes).astype(int))
+        positions = np.arange(len(self.codes)) - np.repeat(self.starts, sizes)
+        self.discount = np.where(positions < np.repeat(ks, sizes), _discount(positions), 0.)
+
+        # ideal DCG: true relevance sorted descending inside each group
+        ideal = np.lexsort((-self.y_true, self.group_of_row))
+        self.ideal_dcg = np.bincount(self.group_of_row, weights=self.y_true[ideal] * self.discount,
+                                     minlength=self.n_groups)
+
+    def ndcg(self, y_pred):
+        y_pred = np.asarray(y_pred, dtype=np.float64)[self.order]
+        ranked = np.lexsort((-y_pred, self.group_of_row))
+        gains = self.y_true[ranked]
+        scores = y_pred[ranked]
+
+        # tied predictions share the mean gain of their block (sklearn's tie averaging)
+        is_block = np.empty(len(scores), dtype=bool)
+        is_block[:1] = True
+        is_block[1:] = (scores[1:] != scores[:-1]) | (self.group_of_row[1:] != self.group_of_row[:-1])
+        block_starts = np.flatnonzero(is_block)
+        counts = np.diff(np.append(block_starts, len(scores)))
+        block_gain = np.add.reduceat(gains, block_starts) / counts
+        block_discount = np.add.reduceat(self.discount, block_starts)
+        dcg = np.bincount(self.group_of_row[block_starts], weights=block_gain * block_discount,
+                          minlength=self.n_groups)
+
+        out = np.zeros(self.n_groups)
+        relevant = self.ideal_dcg != 0
+        out[relevant] = dcg[relevant] / self.ideal_dcg[relevant]
+        return out
+
+
+def ndcg_per_group(y_true, y_pred, groups, k_fraction=0.3):
+    """NDCG@k of every group, k = max(1, int(k_fraction * group size)).
+
+    Equal, up to float rounding, to calling `sklearn.metrics.ndcg_score` on
+    each group separately (ties averaged, all-zero relevance scoring 0).
+    Groups are returned in sorted group order.
+    """
+    _, codes = np.unique(np.asarray(groups), return_inverse=True)
+    return _GroupLayout(codes, y_true, k_fraction).ndcg(y_pred)
+
+
+class GroupedNDCGScorer:
+    """sklearn scorer `scorer(estimator, X, y)`: mean NDCG@k over networks.
+
+    `groups` (e.g. `df['network_id']`) is bound once and aligned with the
+    X passed in by its index, so it works inside `BayesSearchCV`,
+    `cross_val_score` and `permutation_importance` without `groups` having
+    to be routed to the metric. The grouping and ideal DCG of each distinct
+    evaluation subset (a CV fold, the test split) is cached, so repeated
+    calls only sort the new predictions. `groups=None` scores all rows as
+    one group.
+    """
+
+    def __init__(self, groups=None, k_fraction=0.3, cache_size=32):
+        self.k_fraction = k_fraction
+        self.cache_size = cache_size
+        if groups is None:
+            self.index = None
+            self.codes = None
+        else:
+            self.index = getattr(groups, 'index', None)
+            _, self.codes = np.unique(np.asarray(groups), return_inverse=True)
+        self._layouts = {}
+
+    def __getstate__(self):
+        # layouts are cheap to rebuild; don't ship them to joblib workers
+        state = self.__dict__.copy()
+        state['_layouts'] = {}
+        return state
+
+    def _codes_for(self, X):
+        n = len(X)
+        if self.codes is None:
+            return np.zeros(n, dtype=np.intp), None
+        x_index = getattr(X, 'index', None)
+        if x_index is None or self.index is None:
+            if n != len(self.codes):
+                raise ValueError("X has no index to align with groups and a different length")
+            return self.codes, None
+        if x_index.equals(self.index):
+            return self.codes, None
+        positions = self.index.get_indexer(x_index)
+        if (positions < 0).any():
+            raise ValueError("X contains rows that are not in the scorer's groups")
+        return self.codes[positions], positions
+
+    def layout(self, X, y_true):
+        codes, positions = self._codes_for(X)
+        key = (len(codes), None if positions is None else hash(positions.tobytes()),
+               hash(np.asarray(y_true).tobytes()))
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = _GroupLayout(codes, y_true, self.k_fraction)
+            if len(self._layouts) >= self.cache_size:
+                self._layouts.pop(next(iter(self._layouts)))
+            self._layouts[key] = layout
+        return layout
+
+    def score(self, y_true, y_pred, X):
+        per_group = self.layout(X, y_true).ndcg(y_pred)
+        return float(per_group.mean()) if len(per_group) else 0.0
+
+    def __call__(self, estimator, X, y_true, sample_weight=None):
+        return self.score(y_true, estimator.predict(X), X)
@@ -0,0 +1,245 @@
+import json
+import os
+
+import numpy as np
+
+from .greedy import select_node_outbreak
+
+
+# ========== One outbreak as arrays ==========
+def simulate_outbreak(G, probabilities, node_list, index, tau=0.5, gamma=1.0, rng=None, source=None):
+    """One SIR outbreak from a random source, as (infection_time, infection_count, final_size).
+
+    `infection_time[i]` is when `node_list[i]` was infected (inf if never)
+    and `infection_count[i]` the cumulative I + R right after that event,
+    i.e. its position in infection order (0 if never infected).
+    `index` maps node -> column. The source is drawn from `probabilities`
+    unless given.
+    """
+    import EoN
+
+    if source is None:
+        source = select_node_outbreak(probabilities, node_list)
+    sim_kwargs = {} if rng is None else {'rng': rng}  # EoN < 2.0 has no rng argument
+    sim = EoN.Gillespie_SIR(G, tau=tau, gamma=gamma, initial_infecteds=source,
+                            return_full_data=True, **sim_kwargs)
+    events = sim.transmissions()  # (t, infector, node) in time order, source first
+    infection_time = np.full(len(node_list), np.inf, dtype=np.float32)
+    infection_count = np.zeros(len(node_list), dtype=np.min_scalar_type(len(node_list)))
+    for k, (t, _, v) in enumerate(events, 1):
+        i = index[v]
+        infection_time[i] = t
+        infection_count[i] = k
+    return infection_time, infection_count, len(events)
+
+
+# ========== Persistent simulation pool ==========
+# graph and probabilities of the pool this worker process belongs to
+_WORKER = {}
+
+
+def _worker_state(G, probabilities, node_list, tau, gamma):
+    weights = np.asarray(probabilities, dtype=np.float64)
+    return {
+        'G': G,
+        'weights': weights / weights.sum(),
+        'node_list': node_list,
+        'index': {v: i for i, v in enumerate(node_list)},
+        'tau': tau,
+        'gamma': gamma,
+    }
+
+
+def _init_worker(G, probabilities, node_list, tau, gamma):
+    _WORKER.update(_worker_state(G, probabilities, node_list, tau, gamma))
+
+
+def _run_chunk(seed, count, state=None):
+    # `count` outbreaks from one seed; sources and EoN share the generator
+    state = state or _WORKER
+    rng = np.random.default_rng(seed)
+    node_list = state['node_list']
+    sources = rng.choice(len(node_list), size=count, p=state['weights'])
+    rows = [simulate_outbreak(state['G'], None, node_list, state['index'], state['tau'], state['gamma'],
+                              rng=rng, source=node_list[s])
+            for s in sources]
+    times, counts, finals = zip(*rows)
+    return np.stack(times), np.stack(counts), np.asarray(finals, dtype=np.int32)
+
+
+class SimulationPool:
+    """Long-lived worker processes that simulate outbreaks on one graph.
+
+    The graph, probabilities and parameters reach each worker once, as
+    arguments of the pool initializer; a task is only a seed and a count
+    and comes back as the compact arrays of `simulate_outbreak`. Chunks of
+    `chunk_size` outbreaks are seeded from `SeedSequence(seed)`, so with
+    EoN >= 2.0 a run is reproducible for any `n_jobs`. `n_jobs=1` runs in
+    the calling process. Use as a context manager or call `close()`.
+    """
+
+    def __init__(self, G, probabilities, node_list, tau=0.5, gamma=1.0, n_jobs=-1, chunk_size=25):
+        from joblib import effective_n_jobs
+
+        self.node_list = list(node_list)
+        self.chunk_size = chunk_size
+        self.n_workers = effective_n_jobs(n_jobs)
+        args = (G, probabilities, self.node_list, tau, gamma)
+        self._executor = None
+        self._state = None
+        if self.n_workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=args)
+        else:
+            self._state = _worker_state(*args)
+
+    def run(self, n_sims, n_batches=1, seed=None):
+        n_tasks = -(-n_sims // self.chunk_size)
+        counts = [min(self.chunk_size, n_sims - i * self.chunk_size) for i in range(n_tasks)]
+        seeds = np.random.SeedSequence(seed).spawn(n_tasks)
+        if self._executor is not None:
+            chunks = list(self._executor.map(_run_chunk, seeds, counts))
+        else:
+            chunks = [_run_chunk(s, c, self._state) for s, c in zip(seeds, counts)]
+        times, counts, finals = zip(*chunks)
+        return SimulationSet(self.node_list, np.concatenate(times), np.concatenate(counts),
+                             np.concatenate(finals), n_batches)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ========== Stored simulation sets ==========
+class SimulationSet:
+    """Outbreaks stored as (n_sims x n_nodes) arrays instead of per-node histories.
+
+    A sentinel infected as the k-th node of an outbreak of final size F
+    detects it with a gain of F - k (what the cumulative-curve lookup
+    `cumulative[-1] - cumulative[t.index(infect_time)]` gave); a sentinel
+    that is never infected gains 0. Rows are kept in `n_batches` equal
+    batches so results can still be averaged per batch. `params` is a
+    JSON-able record of how the set was simulated, stored with it by `save`.
+    """
+
+    def __init__(self, nodes, infection_time, infection_count, final_size, n_batches=1, params=None):
+        self.nodes = list(nodes)
+        self.index = {v: i for i, v in enumerate(self.nodes)}
+        self.infection_time = infection_time
+        self.infection_count = infection_count
+        self.final_size = final_size
+        self.n_batches = n_batches
+        self.params = params or {}
+
+    @classmethod
+    def from_outbreaks(cls, nodes, outbreaks, n_batches=1):
+        times, counts, finals = zip(*outbreaks)
+        return cls(nodes, np.stack(times), np.stack(counts),
+                   np.asarray(finals, dtype=np.int32), n_batches)
+
+    def __len__(self):
+        return len(self.final_size)
+
+    def save(self, directory):
+        # plain .npy files, so `load` can memory-map them and processes share one copy
+        os.makedirs(directory, exist_ok=True)
+        for name in ('infection_time', 'infection_count', 'final_size'):
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'nodes': self.nodes, 'n_batches': self.n_batches, 'params': self.params}, f)
+        return directory
+
+    @staticmethod
+    def stored_params(directory):
+        # params of a saved set without loading its arrays; None if no complete set is stored
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f).get('params', {})
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, name + '.npy'), mmap_mode=mode)
+                  for name in ('infection_time', 'infection_count', 'final_size')]
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(meta['nodes'], *arrays, n_batches=meta['n_batches'], params=meta.get('params'))
+
+    @property
+    def nbytes(self):
+        return self.infection_time.nbytes + self.infection_count.nbytes + self.final_size.nbytes
+
+    def columns(self, monitor_nodes):
+        # monitors absent from the simulated network are ignored, as before
+        return [self.index[v] for v in monitor_nodes if v in self.index]
+
+    def detection_gain(self, monitor_nodes):
+        """Best detection gain of the monitor set in every simulation (n_sims,)."""
+        cols = self.columns(monitor_nodes)
+        if not cols:
+            return np.zeros(len(self))
+        counts = self.infection_count[:, cols].astype(np.int64)
+        gains = np.where(counts > 0, self.final_size[:, None] - counts, 0)
+        return gains.max(axis=1)
+
+    def batch_means(self, values):
+        return values.reshape(self.n_batches, -1).mean(axis=1)
+
+    def index_sets(self, sentinel_sets, width=None):
+        """Monitor sets as an (n_sets, width) array of columns, -1 for padding and absent nodes."""
+        width = width or max((len(nodes) for nodes in sentinel_sets), default=0)
+        out = np.full((len(sentinel_sets), width), -1, dtype=np.int64)
+        for row, nodes in zip(out, sentinel_sets):
+            cols = [self.index.get(v, -1) for v in nodes]
+            row[:len(cols)] = cols
+        return out
+
+    def column_gains(self, cols):
+        # (len(cols) + 1, n_sims) gain of the given columns only, read from the
+        # (possibly memory-mapped) arrays, with a zero row at the end for padding
+        counts = np.asarray(self.infection_count[:, cols], dtype=np.int64)
+        gains = np.where(counts > 0, np.asarray(self.final_size)[:, None] - counts, 0)
+        return np.vstack([gains.T, np.zeros((1, len(self)), dtype=gains.dtype)]).astype(np.int32)
+
+    def score_sets(self, index_sets, total_nodes=None, block_size=4_000_000):
+        """Score a table of monitor sets against every simulation in one pass.
+
+        `index_sets` is an (n_sets, k) integer array of columns (see
+        `index_sets`), -1 meaning no monitor. A set detects each outbreak
+        with the best gain of its monitors, as a percentage of
+        `total_nodes` (default: the simulated network's size). Gains are
+        computed per block for the columns the block uses, so a memory-mapped
+        set is never expanded into a private copy. Returns per set the
+        mean over simulations (the mean of the batch means), the std of the
+        batch means and the number of valid monitors.
+        """
+        index_sets = np.asarray(index_sets, dtype=np.int64).reshape(len(index_sets), -1)
+        total_nodes = total_nodes or len(self.nodes)
+        rows = index_sets
+        if rows.shape[1] == 0:
+            rows = np.full((len(rows), 1), -1)  # empty sets gain 0
+        n_sets, k = rows.shape
+        batch_means = np.empty((n_sets, self.n_batches))
+        # sets per block, so the (sets, k, n_sims) gather stays around block_size entries
+        step = max(1, block_size // max(1, k * len(self)))
+        for start in range(0, n_sets, step):
+            block = rows[start:start + step]
+            cols, local = np.unique(block, return_inverse=True)
+            local = local.reshape(block.shape)
+            if cols[0] < 0:
+                cols, local = cols[1:], local - 1  # -1 maps to the zero row at the end
+            gain = self.column_gains(cols)
+            best = gain[local].max(axis=1)
+            values = best / total_nodes * 100
+            batch_means[start:start + step] = values.reshape(len(values), self.n_batches, -1).mean(axis=2)
+        std = batch_means.std(axis=1, ddof=1) if self.n_batches > 1 else np.zeros(n_sets)
+        return batch_means.mean(axis=1), std, (index_sets >= 0).sum(axis=1)
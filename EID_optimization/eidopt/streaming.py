@@ -0,0 +1,447 @@
+import numpy as np
+
+from .simulation import SimulationSet
+
+_NO_PARENT = -9999  # scipy's predecessor value for the source and unreached nodes
+
+
+def _grow(array, size, axis, fill):
+    # at least double the capacity along `axis`, so appends are amortized O(1)
+    if array.shape[axis] >= size:
+        return array
+    shape = list(array.shape)
+    shape[axis] = max(size, 2 * array.shape[axis])
+    out = np.full(shape, fill, dtype=array.dtype)
+    index = [slice(None)] * array.ndim
+    index[axis] = slice(0, array.shape[axis])
+    out[tuple(index)] = array
+    return out
+
+
+# ========== Outbreak bank on a changing graph ==========
+class OutbreakBank:
+    """SIR outbreaks kept as the random draws that produce them.
+
+    Markovian SIR is first-passage percolation: with a recovery delay
+    r[v] ~ Exp(gamma) per node and a transmission delay e[u, v] ~ Exp(tau)
+    per directed edge, u infects v iff e[u, v] < r[u], and infection times
+    are shortest-path times from the source over those edges. This is the
+    same law as EoN's Gillespie_SIR. Keeping r and e for every outbreak, a
+    graph change re-solves only the outbreaks it can alter: those whose
+    shortest-path tree uses a removed edge, whose source was removed or
+    moved to a new node, or in which an added edge gives a shorter path.
+    Draws of untouched outbreaks stay valid, so the bank remains a sample
+    of the changed graph.
+
+    The bank is solved in full once, with scipy. After that an altered
+    outbreak is repaired in place (see `_repair`): only the infection
+    times that the change invalidates or lowers are recomputed, so an
+    update costs the size of the change plus the part of each altered
+    outbreak that moves, not the size of the graph. `touched` is the number
+    of infection times the last update reset or lowered.
+
+    Columns are node slots; removed nodes keep theirs, inactive. Use
+    `simulation_set` to score sentinel sets on the current bank.
+    """
+
+    def __init__(self, G, probabilities, n_sims=1000, tau=0.5, gamma=1.0, seed=None):
+        self.n_sims = n_sims
+        self.tau = tau
+        self.gamma = gamma
+        self.rng = np.random.default_rng(seed)
+        self.nodes = []
+        self.index = {}
+        self.neighbors = []  # per column, set of neighbour columns
+        self.n_cols = 0
+        self.active = np.zeros(0, dtype=bool)
+        self.weights = np.zeros(0)
+        self.total_weight = 0.0
+        self.recovery = np.zeros((n_sims, 0))
+        self.infection_time = np.zeros((n_sims, 0))
+        self.parent = np.zeros((n_sims, 0), dtype=np.int32)
+        self.infection_count = np.zeros((n_sims, 0), dtype=np.int32)
+        self.final_size = np.zeros(n_sims, dtype=np.int32)
+        self.order = [np.zeros(0, dtype=np.int64)] * n_sims  # infected columns in infection order
+        self.touched = 0
+        self.slot = {}  # directed (tail column, head column) -> row of `delay`
+        self.free_slots = []
+        self.delay = np.zeros((0, n_sims))
+        # tail and head column of every slot, -1 for free slots
+        self.tail = np.zeros(0, dtype=np.int64)
+        self.head = np.zeros(0, dtype=np.int64)
+        self._structure = None
+
+        for v, p in zip(G.nodes(), probabilities):
+            self._add_node(v, p)
+        for u, v in G.edges():
+            self._add_edge(self.index[u], self.index[v])
+        self.source = self.rng.choice(self.n_cols, size=n_sims, p=self._source_weights())
+        self._solve(np.arange(n_sims))
+
+    # ----- structure -----
+    def _add_node(self, v, probability):
+        if v in self.index:
+            raise ValueError(f"node {v!r} is already in the bank")
+        col = self.n_cols
+        self.n_cols += 1
+        self.active = _grow(self.active, self.n_cols, 0, False)
+        self.weights = _grow(self.weights, self.n_cols, 0, 0.0)
+        self.recovery = _grow(self.recovery, self.n_cols, 1, 0.0)
+        self.infection_time = _grow(self.infection_time, self.n_cols, 1, np.inf)
+        self.parent = _grow(self.parent, self.n_cols, 1, _NO_PARENT)
+        self.infection_count = _grow(self.infection_count, self.n_cols, 1, 0)
+        self.nodes.append(v)
+        self.index[v] = col
+        self.neighbors.append(set())
+        self.active[col] = True
+        self.weights[col] = probability
+        self.total_weight += probability
+        self.recovery[:, col] = self.rng.exponential(1 / self.gamma, self.n_sims)
+        return col
+
+    def _add_edge(self, i, j):
+        if i == j or j in self.neighbors[i]:
+            return  # self-loops never transmit; multi-edges count once
+        for edge in ((i, j), (j, i)):
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            else:
+                slot = len(self.slot)
+                self.delay = _grow(self.delay, slot + 1, 0, np.inf)
+                self.tail = _grow(self.tail, slot + 1, 0, -1)
+                self.head = _grow(self.head, slot + 1, 0, -1)
+            self.slot[edge] = slot
+            self.tail[slot], self.head[slot] = edge
+            self.delay[slot] = self.rng.exponential(1 / self.tau, self.n_sims)
+        self.neighbors[i].add(j)
+        self.neighbors[j].add(i)
+        self._structure = None
+
+    def _remove_edge(self, i, j):
+        for edge in ((i, j), (j, i)):
+            slot = self.slot.pop(edge)
+            self.tail[slot] = self.head[slot] = -1
+            self.free_slots.append(slot)
+        self.neighbors[i].discard(j)
+        self.neighbors[j].discard(i)
+        self._structure = None
+
+    def _source_weights(self):
+        weights = self.weights[:self.n_cols]
+        return weights / weights.sum()
+
+    def _csr_structure(self):
+        # directed edges sorted by tail, for solving whole outbreaks at once;
+        # updates repair outbreaks through the adjacency sets instead
+        if self._structure is None:
+            slots = np.flatnonzero(self.tail >= 0)
+            slots = slots[np.argsort(self.tail[slots], kind='stable')]
+            tails, heads = self.tail[slots], self.head[slots]
+            indptr = np.concatenate([[0], np.cumsum(np.bincount(tails, minlength=self.n_cols))])
+            self._structure = (indptr, heads, slots, tails)
+        return self._structure
+
+    # ----- outbreaks -----
+    def _solve(self, rows):
+        from scipy.sparse import csr_matrix
+        from scipy.sparse import csgraph
+
+        if not len(rows):
+            return
+        indptr, heads, slots, tails = self._csr_structure()
+        n = self.n_cols
+        for row in rows:
+            delay = self.delay[slots, row]
+            # an edge transmits only before its tail recovers
+            delay = np.where(delay < self.recovery[row, tails], delay, np.inf)
+            graph = csr_matrix((delay, heads, indptr), shape=(n, n))
+            times, parent = csgraph.dijkstra(graph, directed=True, indices=self.source[row],
+                                             return_predecessors=True)
+            self.infection_time[row, :n] = times
+            self.parent[row, :n] = parent
+            infected = np.flatnonzero(np.isfinite(times))
+            order = infected[np.argsort(times[infected], kind='stable')]
+            self.infection_count[row, :n] = 0
+            self.infection_count[row, order] = np.arange(1, len(order) + 1)
+            self.final_size[row] = len(order)
+            self.order[row] = order
+
+    def _repair(self, row, roots=(), reset=False, new_edges=()):
+        # Re-solve one outbreak from the infection times that are still valid.
+        # The subtrees hanging from `roots` (heads of removed tree edges), or
+        # the whole outbreak if its source was redrawn, lose their times; they
+        # are seeded from their valid neighbours, the heads of `new_edges`
+        # from their tails, and a Dijkstra over the adjacency sets runs only
+        # while a time improves. Every other time is already a shortest path,
+        # so the result equals a full solve. Returns the number of times reset
+        # or lowered.
+        import heapq
+
+        time, parent, recovery = self.infection_time[row], self.parent[row], self.recovery[row]
+        old_order = self.order[row]
+        if reset:
+            invalid = set(old_order.tolist())
+        else:
+            invalid = {r for r in roots if np.isfinite(time[r])}
+            stack = list(invalid)
+            while stack:
+                x = stack.pop()
+                for y in self.neighbors[x]:
+                    if parent[y] == x and y not in invalid:
+                        invalid.add(y)
+                        stack.append(y)
+        cols = np.fromiter(invalid, dtype=np.int64, count=len(invalid))
+        time[cols] = np.inf
+        parent[cols] = _NO_PARENT
+
+        heap = []
+        touched = set(invalid)
+
+        def lower(t, x, p):
+            if t < time[x]:
+                time[x] = t
+                parent[x] = p
+                touched.add(x)
+                heapq.heappush(heap, (t, x))
+
+        def transmits(a, b):
+            # delay of a -> b if it beats a's recovery, else inf
+            delay = self.delay[self.slot[(a, b)], row]
+            return delay if delay < recovery[a] else np.inf
+
+        if reset:
+            lower(0.0, int(self.source[row]), _NO_PARENT)
+        for x in invalid:
+            for y in self.neighbors[x]:
+                lower(time[y] + transmits(y, x), x, y)
+        for i, j in new_edges:
+            lower(time[i] + transmits(i, j), j, i)
+            lower(time[j] + transmits(j, i), i, j)
+        while heap:
+            t, x = heapq.heappop(heap)
+            if t > time[x]:
+                continue
+            for y in self.neighbors[x]:
+                lower(t + transmits(x, y), y, x)
+
+        # infection order of the old infected plus everything that moved
+        changed = np.fromiter(touched, dtype=np.int64, count=len(touched))
+        candidates = np.union1d(old_order, changed)
+        infected = candidates[np.isfinite(time[candidates])]
+        order = infected[np.argsort(time[infected], kind='stable')]
+        self.infection_count[row, old_order] = 0
+        self.infection_count[row, order] = np.arange(1, len(order) + 1)
+        self.final_size[row] = len(order)
+        self.order[row] = order
+        return len(touched)
+
+    def update(self, add_edges=(), remove_edges=(), add_nodes=None, remove_nodes=()):
+        """Apply one batch of changes and re-solve the outbreaks it alters.
+
+        Removals are applied before insertions. `add_nodes` maps new nodes
+        to their outbreak probability (source weight). Returns the indices of
+        the re-solved outbreaks.
+        """
+        roots = {}  # outbreak -> heads of its removed shortest-path-tree edges
+        reset = np.zeros(self.n_sims, dtype=bool)  # outbreaks with a redrawn source
+        improved = np.zeros(self.n_sims, dtype=bool)
+        n = self.n_cols
+
+        removed = [self.index[v] for v in remove_nodes]
+        edges = {tuple(sorted((self.index[u], self.index[v]))) for u, v in remove_edges}
+        edges |= {tuple(sorted((i, j))) for i in removed for j in self.neighbors[i]}
+        for i, j in edges:
+            if j not in self.neighbors[i]:
+                continue
+            # shortest paths change only if the edge is in the shortest-path tree
+            for a, b in ((i, j), (j, i)):
+                for row in np.flatnonzero(self.parent[:, b] == a):
+                    roots.setdefault(row, []).append(b)
+            self._remove_edge(i, j)
+        if removed:
+            # a removed node loses all its edges, so its infection times go with them
+            self.active[removed] = False
+            self.total_weight -= self.weights[removed].sum()
+            self.weights[removed] = 0
+            moved = np.isin(self.source, removed)
+            if moved.any():
+                # a redrawn source is re-solved anyway, which costs more than the draw
+                reset |= moved
+                self.source[moved] = self.rng.choice(n, size=moved.sum(), p=self._source_weights())
+
+        if add_nodes:
+            new = [self._add_node(v, p) for v, p in add_nodes.items()]
+            # each outbreak starts at a new node with their share of the total weight
+            new_weight = self.weights[new].sum()
+            if new_weight > 0:  # nodes that cannot be a source move no outbreak
+                moved = self.rng.random(self.n_sims) < new_weight / self.total_weight
+                reset |= moved
+                self.source[moved] = self.rng.choice(new, size=moved.sum(), p=self.weights[new] / new_weight)
+
+        new_edges = []
+        for u, v in add_edges:
+            i, j = self.index[u], self.index[v]
+            if not (self.active[i] and self.active[j]):
+                raise ValueError(f"edge ({u!r}, {v!r}) touches a removed node")
+            if i == j or j in self.neighbors[i]:
+                continue
+            self._add_edge(i, j)
+            new_edges.append((i, j))
+            # exact for outbreaks without removals; the others try every new edge anyway
+            for a, b in ((i, j), (j, i)):
+                delay = self.delay[self.slot[(a, b)]]
+                improved |= (delay < self.recovery[:, a]) & \
+                            (self.infection_time[:, a] + delay < self.infection_time[:, b])
+
+        rows = np.union1d(np.fromiter(roots, dtype=np.int64, count=len(roots)),
+                          np.flatnonzero(reset | improved))
+        self.touched = sum(self._repair(row, roots.get(row, ()), reset[row], new_edges) for row in rows)
+        return rows
+
+    def active_columns(self):
+        return np.flatnonzero(self.active[:self.n_cols])
+
+    def gain(self, cols):
+        """(n_sims, len(cols)) detection gain of single nodes, as in `SimulationSet.detection_gain`."""
+        counts = self.infection_count[:, cols]
+        return np.where(counts > 0, self.final_size[:, None] - counts, 0)
+
+    def simulation_set(self, n_batches=1):
+        cols = self.active_columns()
+        return SimulationSet([self.nodes[i] for i in cols], self.infection_time[:, cols].astype(np.float32),
+                             self.infection_count[:, cols], self.final_size.copy(), n_batches)
+
+
+# ========== Sentinels on a changing graph ==========
+class StreamingSentinels:
+    """A sentinel set kept up to date while the contact network changes.
+
+    Outbreaks live in an `OutbreakBank`, so a batch of edge/node insertions
+    and deletions repairs only the infection times it alters. The sentinels
+    are then re-optimized by swap search (best improving swap, at most
+    `max_swaps` per batch) over the nodes within `radius` hops of the
+    change; removed sentinels are refilled greedily from the same pool.
+    The work of a batch depends on the size of the change and of the
+    outbreak paths it moves, not of the graph. The initial set, unless
+    given, is the greedy maximizer of the mean detection gain on the bank.
+
+    What is kept up to date is the bank (infection times, i.e. distances
+    along each outbreak's transmission paths) and the sentinel set. The
+    RFSM's node features are not: betweenness, eigenvector centrality and
+    path lengths are global, so selection here scores candidates on the
+    bank rather than with the surrogate.
+    """
+
+    def __init__(self, G, probabilities, k, sentinels=None, n_sims=1000, tau=0.5, gamma=1.0,
+                 radius=1, max_swaps=None, seed=None):
+        self.G = G.copy()
+        self.bank = OutbreakBank(self.G, probabilities, n_sims, tau, gamma, seed)
+        self.k = k
+        self.radius = radius
+        self.max_swaps = k if max_swaps is None else max_swaps
+        if sentinels is None:
+            cols = self._fill([], self.bank.active_columns(), k)
+        else:
+            cols = [self.bank.index[v] for v in sentinels]
+        self._cols = cols
+
+    @property
+    def sentinels(self):
+        return [self.bank.nodes[i] for i in self._cols]
+
+    def score(self):
+        """Mean detection gain of the sentinels, in % of the current network size."""
+        if not self._cols:
+            return 0.0
+        best = self.bank.gain(self._cols).max(axis=1)
+        return best.mean() / self.G.number_of_nodes() * 100
+
+    def _fill(self, cols, pool, n):
+        # greedy: each added node maximizes the mean best gain of the set
+        cols = list(cols)
+        best = self.bank.gain(cols).max(axis=1) if cols else np.zeros(self.bank.n_sims)
+        pool = np.array([c for c in pool if c not in cols], dtype=np.int64)
+        gains = self.bank.gain(pool)
+        for _ in range(min(n, len(pool))):
+            scores = np.maximum(best[:, None], gains).mean(axis=0)
+            pick = int(np.argmax(scores))
+            cols.append(int(pool[pick]))
+            best = np.maximum(best, gains[:, pick])
+            pool, gains = np.delete(pool, pick), np.delete(gains, pick, axis=1)
+        return cols
+
+    def _swap(self, pool):
+        swaps = []
+        pool = np.array([c for c in pool if c not in self._cols], dtype=np.int64)
+        if not len(pool) or not self._cols:
+            return swaps
+        gains = self.bank.gain(pool)
+        for _ in range(self.max_swaps):
+            current = self.bank.gain(self._cols)
+            score = current.max(axis=1).mean()
+            best_score, best_swap = score, None
+            for s in range(len(self._cols)):
+                others = np.delete(current, s, axis=1)
+                without = others.max(axis=1) if others.shape[1] else np.zeros(len(current))
+                scores = np.maximum(without[:, None], gains).mean(axis=0)
+                c = int(np.argmax(scores))
+                if scores[c] > best_score + 1e-12:
+                    best_score, best_swap = scores[c], (s, c)
+            if best_swap is None:
+                break
+            s, c = best_swap
+            out, self._cols[s] = self._cols[s], int(pool[c])
+            swaps.append((self.bank.nodes[out], self.bank.nodes[self._cols[s]]))
+            pool[c], gains[:, c] = out, self.bank.gain([out])[:, 0]
+        return swaps
+
+    def update(self, add_edges=(), remove_edges=(), add_nodes=None, remove_nodes=()):
+        """Apply one batch of changes and re-optimize the sentinels around it.
+
+        Returns a summary with the number of re-solved outbreaks, the number
+        of infection times they reset or lowered, the size of the candidate
+        pool and the (removed, added) sentinel swaps.
+        """
+        import networkx as nx
+
+        add_nodes = dict(add_nodes or {})
+        missing = [e for e in remove_edges if not self.G.has_edge(*e)] + \
+                  [v for v in remove_nodes if v not in self.G]
+        if missing:
+            raise ValueError(f"not in the graph: {missing}")
+        present = [v for v in add_nodes if v in self.G]
+        if present:
+            raise ValueError(f"already in the graph: {present}")
+        gone = set(remove_nodes)
+        dangling = [e for e in add_edges
+                    if any((v not in self.G or v in gone) and v not in add_nodes for v in e)]
+        if dangling:
+            raise ValueError(f"edges with an endpoint not in the graph: {dangling}")
+        changed = {v for e in list(add_edges) + list(remove_edges) for v in e}
+        for v in remove_nodes:
+            changed.update(self.G.neighbors(v))
+        changed.update(add_nodes)
+
+        self.G.remove_edges_from(remove_edges)
+        self.G.remove_nodes_from(remove_nodes)
+        self.G.add_nodes_from(add_nodes)
+        self.G.add_edges_from(add_edges)
+        rows = self.bank.update(add_edges, remove_edges, add_nodes, remove_nodes)
+
+        pool = set()
+        for v in changed:
+            if v in self.G:
+                pool.update(nx.single_source_shortest_path_length(self.G, v, cutoff=self.radius))
+        pool = [self.bank.index[v] for v in pool]
+
+        removed = {self.bank.index[v] for v in remove_nodes}
+        kept = [c for c in self._cols if c not in removed]
+        lost = len(self._cols) - len(kept)
+        if lost:
+            # refill from the change's neighbourhood, or from the whole graph if that is too small
+            fill_pool = pool if len(set(pool) - set(kept)) >= lost else self.bank.active_columns()
+            kept = self._fill(kept, fill_pool, lost)
+        self._cols = kept
+        swaps = self._swap(pool)
+        return {'affected_outbreaks': len(rows), 'touched_nodes': self.bank.touched,
+                'candidates': len(pool), 'swaps': swaps}
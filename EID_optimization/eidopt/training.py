@@ -0,0 +1,215 @@
+# Surrogate-model training helpers. This module imports sklearn/skopt at the
+# top, so it is only loaded when a training script asks for it.
+import math
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.model_selection import GroupKFold, GroupShuffleSplit
+from skopt import BayesSearchCV
+from skopt.space import check_dimension
+
+
+class WarmStartBayesSearchCV(BayesSearchCV):
+    """BayesSearchCV that first evaluates `warm_start_params`.
+
+    Each warm point is cross-validated like any other candidate (so it shows
+    up in `cv_results_` and can win `best_params_`) and told to the optimizer
+    before its first `ask`, so the search starts from it. `n_iter` counts
+    only the new points.
+    """
+
+    def __init__(self, estimator, search_spaces, warm_start_params=None, **kwargs):
+        self.warm_start_params = warm_start_params
+        super().__init__(estimator, search_spaces, **kwargs)
+
+    def _run_search(self, evaluate_candidates):
+        self._evaluate_candidates = evaluate_candidates
+        try:
+            super()._run_search(evaluate_candidates)
+        finally:
+            del self._evaluate_candidates
+
+    def _make_optimizer(self, params_space):
+        optimizer = super()._make_optimizer(params_space)
+        names = sorted(params_space)  # skopt's dimension order
+        for params in self.warm_start_params or []:
+            results = self._evaluate_candidates([params])
+            score_key = 'mean_test_score' if 'mean_test_score' in results else f"mean_test_{self.refit}"
+            optimizer.tell([params[name] for name in names], -results[score_key][-1])
+        return optimizer
+
+
+def group_split(groups, test_size=0.3, random_state=42, n_folds=5):
+    """One train/test split by network plus fixed GroupKFold folds of the train part.
+
+    Returns (train_idx, test_idx, folds). `folds` is a list of (train, test)
+    positions relative to the train part and can be passed as `cv=` to any
+    number of searches.
+    """
+    groups = np.asarray(groups)
+    dummy = np.zeros(len(groups))
+    gss = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    train_idx, test_idx = next(gss.split(dummy, groups=groups))
+    folds = list(GroupKFold(n_splits=n_folds).split(dummy[train_idx], groups=groups[train_idx]))
+    return train_idx, test_idx, folds
+
+
+# ========== Surrogate backends ==========
+# parameter that sets the number of trees, used as the fidelity of SuccessiveHalvingSearch
+SURROGATE_RESOURCE = {'rf': 'n_estimators', 'hgb': 'max_iter'}
+
+
+def make_surrogate(backend='rf', n_jobs=-1, random_state=42, **params):
+    """Unfitted RFSM surrogate: 'rf' (RandomForestRegressor) or 'hgb'.
+
+    'hgb' is HistGradientBoostingRegressor on 255-bin histograms, much
+    faster to fit and far smaller than a deep forest. It runs on OpenMP
+    threads (no `n_jobs`), and early stopping is off so `max_iter` is the
+    number of trees, as `n_estimators` is for the forest.
+    """
+    if backend == 'rf':
+        return RandomForestRegressor(n_jobs=n_jobs, random_state=random_state, **params)
+    if backend == 'hgb':
+        return HistGradientBoostingRegressor(early_stopping=False, random_state=random_state, **params)
+    raise ValueError(f"unknown surrogate backend {backend!r}")
+
+
+# ========== Multi-fidelity search ==========
+def _take(data, rows):
+    return data.iloc[rows] if hasattr(data, 'iloc') else data[rows]
+
+
+def _fit_and_score(estimator, params, X, y, train, test, scorer):
+    est = clone(estimator).set_params(**params)
+    est.fit(_take(X, train), _take(y, train))
+    return scorer(est, _take(X, test), _take(y, test))
+
+
+def sample_candidates(search_spaces, n_candidates, random_state=None):
+    # accepts the (low, high) tuples of 04 as well as skopt Integer/Real
+    rng = np.random.RandomState(random_state)
+    dims = {name: check_dimension(space) for name, space in search_spaces.items()}
+    candidates = []
+    for _ in range(n_candidates):
+        params = {}
+        for name, dim in dims.items():
+            value = dim.rvs(n_samples=1, random_state=rng)[0]
+            params[name] = value.item() if hasattr(value, 'item') else value
+        candidates.append(params)
+    return candidates
+
+
+class SuccessiveHalvingSearch:
+    """Successive halving / Hyperband over a tree-ensemble search space.
+
+    Fidelity is the fraction `eta ** (rung - last_rung)` applied to both the
+    candidate's `resource_param` (its number of trees) and the set of
+    networks (groups) used for the grouped CV; each rung keeps the best
+    `1 / eta` of the candidates, and only the last rung runs at full
+    fidelity. Networks are added in one fixed random order, so a rung's
+    networks include those of the rung before.
+    `hyperband=True` runs every bracket, from many cheap candidates down to
+    a few full-fidelity ones; otherwise a single successive-halving bracket
+    with `n_candidates` is run. `cv` is a number of GroupKFold splits or a
+    list of (train, test) positions, e.g. the folds of `group_split`, which
+    every rung then uses restricted to its networks; `groups` passed to
+    `fit` choose those networks. Attributes mirror BayesSearchCV
+    (`best_params_`, `best_score_`, `best_estimator_`, `cv_results_`).
+    """
+
+    def __init__(self, estimator, search_spaces, scoring, n_candidates=27, eta=3, n_rungs=3,
+                 hyperband=False, cv=5, min_estimators=10, min_groups=10, warm_start_params=None,
+                 n_jobs=-1, random_state=42, refit=True, verbose=0, resource_param='n_estimators'):
+        self.estimator = estimator
+        self.search_spaces = search_spaces
+        self.scoring = scoring
+        self.n_candidates = n_candidates
+        self.eta = eta
+        self.n_rungs = n_rungs
+        self.hyperband = hyperband
+        self.cv = cv
+        self.min_estimators = min_estimators
+        self.min_groups = min_groups
+        self.warm_start_params = warm_start_params
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+        self.verbose = verbose
+        self.resource_param = resource_param
+
+    def _rung_folds(self, groups, group_order, fraction):
+        n_groups = min(len(group_order), max(self.min_groups, math.ceil(fraction * len(group_order))))
+        in_rung = np.isin(groups, group_order[:n_groups])
+        if not isinstance(self.cv, int):
+            folds = [(np.asarray(train), np.asarray(test)) for train, test in self.cv]
+            folds = [(train[in_rung[train]], test[in_rung[test]]) for train, test in folds]
+            return [(train, test) for train, test in folds if len(train) and len(test)]
+        rows = np.flatnonzero(in_rung)
+        n_splits = min(self.cv, n_groups)
+        return [(rows[train], rows[test])
+                for train, test in GroupKFold(n_splits=n_splits).split(rows, groups=groups[rows])]
+
+    def _run_bracket(self, X, y, groups, group_order, candidates, s, parallel, bracket):
+        last_rung = s
+        for rung in range(last_rung + 1):
+            fraction = self.eta ** (rung - last_rung)
+            folds = self._rung_folds(groups, group_order, fraction)
+            rung_params = []
+            for params in candidates:
+                params = dict(params)
+                if self.resource_param in params:
+                    params[self.resource_param] = max(self.min_estimators,
+                                                      round(fraction * params[self.resource_param]))
+                rung_params.append(params)
+
+            scores = parallel(
+                delayed(_fit_and_score)(self.estimator, params, X, y, train, test, self.scoring)
+                for params in rung_params for train, test in folds
+            )
+            scores = np.asarray(scores).reshape(len(candidates), len(folds))
+            means = scores.mean(axis=1)
+            for params, fidelity_params, score_row in zip(candidates, rung_params, scores):
+                self.cv_results_.append({
+                    'bracket': bracket, 'rung': rung, 'fidelity': fraction,
+                    'params': params, 'fit_params': fidelity_params,
+                    'mean_test_score': score_row.mean(), 'std_test_score': score_row.std(),
+                })
+            if self.verbose:
+                print(f"Bracket {bracket} rung {rung}: {len(candidates)} candidates, "
+                      f"fidelity {fraction:.3f}, best {means.max():.4f}")
+
+            if rung == last_rung:
+                best = int(np.argmax(means))
+                return candidates[best], means[best]
+            keep = max(1, math.ceil(len(candidates) / self.eta))
+            order = np.argsort(-means, kind='stable')[:keep]
+            candidates = [candidates[i] for i in order]
+
+    def fit(self, X, y, groups=None):
+        if groups is None:
+            groups = np.arange(len(y))  # every row its own group
+        groups = np.asarray(groups)
+        rng = np.random.RandomState(self.random_state)
+        group_order = rng.permutation(np.unique(groups))
+
+        s_max = self.n_rungs - 1
+        brackets = range(s_max, -1, -1) if self.hyperband else [s_max]
+        self.cv_results_ = []
+        self.best_score_ = -np.inf
+        self.best_params_ = None
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            for bracket, s in enumerate(brackets):
+                # Hyperband bracket sizes; the most aggressive bracket gets n_candidates
+                n = math.ceil(self.n_candidates * self.eta ** (s - s_max) * (s_max + 1) / (s + 1))
+                candidates = sample_candidates(self.search_spaces, n, rng.randint(2**31))
+                if bracket == 0 and self.warm_start_params:
+                    candidates = [dict(p) for p in self.warm_start_params] + candidates
+                params, score = self._run_bracket(X, y, groups, group_order, candidates, s, parallel, bracket)
+                if score > self.best_score_:
+                    self.best_params_, self.best_score_ = params, score
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from eidopt.forest import CompactForest, export_forest
+
+
+def fitted_forest(n_outputs=1):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((500, 6)), columns=[f"f{i}" for i in range(6)])
+    y = rng.random((500, n_outputs)) if n_outputs > 1 else X['f0'] * 2 + rng.random(500)
+    model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0, n_jobs=1).fit(X, y)
+    return model, X
+
+
+def test_predict_is_bit_identical(tmp_path):
+    model, X = fitted_forest()
+    compact = CompactForest.load(export_forest(model, str(tmp_path / 'forest')))
+    X_new = X.sample(frac=1, random_state=1)
+    X_new.iloc[:20, 2] = np.nan  # missing values follow missing_go_to_left
+    np.testing.assert_array_equal(compact.predict(X_new), model.predict(X_new))
+    # block boundaries do not change the result
+    np.testing.assert_array_equal(compact.predict(X_new, block_rows=7), model.predict(X_new))
+
+
+def test_multi_output_and_column_order(tmp_path):
+    model, X = fitted_forest(n_outputs=3)
+    compact = CompactForest.load(export_forest(model, str(tmp_path / 'forest')), mmap=False)
+    np.testing.assert_array_equal(compact.predict(X[X.columns[::-1]]), model.predict(X))
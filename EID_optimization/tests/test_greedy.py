@@ -0,0 +1,34 @@
+import networkx as nx
+import numpy as np
+
+from eidopt.greedy import greedy_max_influence, tie_unranked
+
+# the top-k fractions 04 clips ranks at
+RANK_THRESHOLDS = [0.1, 0.2, 0.3]
+
+
+def partial_ranks(fraction=None, gain_tol=None):
+    G = nx.karate_club_graph()
+    node = list(G.nodes())
+    probabilities = np.full(len(node), 1 / len(node))
+    rankings = greedy_max_influence(G, node, probabilities, simulations=5, rng=np.random.default_rng(0),
+                                    fraction=fraction, gain_tol=gain_tol)
+    return node, rankings, tie_unranked(rankings, node)
+
+
+def test_fraction_caps_the_greedy_rounds():
+    node, rankings, ranks = partial_ranks(fraction=0.1)
+    assert sorted(rankings.values()) == list(range(int(np.ceil(0.1 * len(node)))))
+    assert set(ranks) == set(node)
+    assert all(ranks[n] == rankings[n] for n in rankings)
+
+
+def test_unranked_nodes_stay_above_every_threshold():
+    # a huge gain_tol stops right after the first pick
+    node, rankings, ranks = partial_ranks(gain_tol=1e9)
+    assert list(rankings.values()) == [0]
+    for n in node:
+        if n not in rankings:
+            assert ranks[n] == len(node)
+            # 04 scores rank = ranking / network size
+            assert ranks[n] / len(node) >= max(RANK_THRESHOLDS)
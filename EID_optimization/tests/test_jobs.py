@@ -0,0 +1,54 @@
+import time
+
+from eidopt.jobs import JobTable, drain
+
+
+def test_claims_follow_cost_and_never_repeat(tmp_path):
+    table = JobTable(str(tmp_path / 'jobs.sqlite'))
+    table.add([1, 2, 3], costs=[5, 50, 20])
+    assert [table.claim('a'), table.claim('b'), table.claim('a')] == [2, 3, 1]
+    assert table.claim('b') is None
+    assert table.counts() == {'running': 3}
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    table = JobTable(str(tmp_path / 'jobs.sqlite'), lease_seconds=0.05)
+    table.add([1])
+    assert table.claim('a') == 1
+    assert table.claim('b') is None
+    time.sleep(0.1)
+    assert table.claim('b') == 1
+    # the first owner lost the lease: its late result is not recorded
+    assert not table.complete('a', 1, n_rows=10)
+    assert table.complete('b', 1, n_rows=12)
+    assert table.done_ids() == {1}
+
+
+def test_release_returns_the_job_to_pending(tmp_path):
+    table = JobTable(str(tmp_path / 'jobs.sqlite'))
+    table.add([1])
+    assert table.claim('a') == 1
+    table.release('b', 1)  # not the owner
+    assert table.counts() == {'running': 1}
+    table.release('a', 1)
+    assert table.counts() == {'pending': 1}
+    assert table.claim('b') == 1
+
+
+def test_drain_releases_the_job_it_failed_on(tmp_path):
+    table = JobTable(str(tmp_path / 'jobs.sqlite'))
+    table.add([1, 2, 3])
+    table.mark_done([3])
+
+    def work(network_id):
+        if network_id == 2:
+            raise KeyboardInterrupt
+        return network_id * 10
+
+    try:
+        drain(table, work, worker_id='a')
+    except KeyboardInterrupt:
+        pass
+    assert table.counts() == {'done': 2, 'pending': 1}
+    assert drain(table, lambda network_id: 0, worker_id='b') == [2]
+    assert table.done_ids() == {1, 2, 3}
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import ndcg_score
+
+from eidopt.scoring import GroupedNDCGScorer, ndcg_per_group
+
+
+def sklearn_per_group(y_true, y_pred, groups, k_fraction):
+    out = []
+    for g in np.unique(groups):
+        rows = groups == g
+        k = max(1, int(k_fraction * rows.sum()))
+        out.append(ndcg_score([y_true[rows]], [y_pred[rows]], k=k))
+    return np.array(out)
+
+
+@pytest.mark.parametrize('k_fraction', [0.1, 0.3, 1.0])
+def test_matches_sklearn_per_group(k_fraction):
+    rng = np.random.default_rng(0)
+    groups = rng.integers(0, 12, 600)
+    y_true = rng.random(600)
+    y_true[groups == 3] = 0  # a group without relevance scores 0
+    # rounded predictions give ties, which sklearn averages
+    y_pred = np.round(rng.random(600), 1)
+    np.testing.assert_allclose(ndcg_per_group(y_true, y_pred, groups, k_fraction),
+                               sklearn_per_group(y_true, y_pred, groups, k_fraction), rtol=1e-12)
+
+
+class Constant:
+    def __init__(self, values):
+        self.values = values
+
+    def predict(self, X):
+        return self.values.loc[X.index].to_numpy()
+
+
+def test_scorer_aligns_groups_by_index():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'network_id': rng.integers(0, 8, 400), 'x': rng.random(400), 'y': rng.random(400)})
+    scorer = GroupedNDCGScorer(df['network_id'], k_fraction=0.3)
+    pred = pd.Series(rng.random(400), index=df.index)
+
+    # a shuffled subset, as a CV fold hands it over
+    fold = df.sample(frac=0.5, random_state=0)
+    expected = sklearn_per_group(fold['y'].to_numpy(), pred.loc[fold.index].to_numpy(),
+                                 fold['network_id'].to_numpy(), 0.3).mean()
+    assert scorer(Constant(pred), fold[['x']], fold['y']) == pytest.approx(expected, rel=1e-12)
+    # the cached layout gives the same answer
+    assert scorer(Constant(pred), fold[['x']], fold['y']) == pytest.approx(expected, rel=1e-12)
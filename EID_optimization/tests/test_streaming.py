@@ -0,0 +1,73 @@
+import copy
+
+import networkx as nx
+import numpy as np
+
+from eidopt.streaming import OutbreakBank, StreamingSentinels
+
+
+def resolved_from_scratch(bank):
+    # the same draws, every outbreak solved again on the current graph
+    fresh = copy.deepcopy(bank)
+    fresh._structure = None
+    fresh._solve(np.arange(fresh.n_sims))
+    return fresh
+
+
+def assert_same_outbreaks(bank, fresh):
+    n = bank.n_cols
+    np.testing.assert_array_equal(bank.infection_time[:, :n], fresh.infection_time[:, :n])
+    np.testing.assert_array_equal(bank.infection_count[:, :n], fresh.infection_count[:, :n])
+    np.testing.assert_array_equal(bank.final_size, fresh.final_size)
+
+
+def test_update_matches_full_resolve():
+    G = nx.gnm_random_graph(300, 900, seed=1)
+    rng = np.random.default_rng(1)
+    bank = OutbreakBank(G, rng.random(300), n_sims=200, seed=1)
+    edges = list(G.edges())
+
+    bank.update(remove_edges=edges[:40])
+    assert_same_outbreaks(bank, resolved_from_scratch(bank))
+    bank.update(add_edges=[(u, v) for u, v in rng.integers(0, 300, (40, 2)) if u != v])
+    assert_same_outbreaks(bank, resolved_from_scratch(bank))
+    bank.update(remove_nodes=[0, 1, 2], add_nodes={'a': 0.5, 'b': 0.5})
+    assert_same_outbreaks(bank, resolved_from_scratch(bank))
+    bank.update(add_edges=[('a', 10), ('b', 20), ('a', 'b')], remove_edges=[edges[100]])
+    assert_same_outbreaks(bank, resolved_from_scratch(bank))
+
+
+def test_zero_weight_nodes_move_no_source():
+    G = nx.karate_club_graph()
+    bank = OutbreakBank(G, [1.0] * len(G), n_sims=50, seed=0)
+    sources = bank.source.copy()
+    bank.update(add_nodes={100: 0.0}, add_edges=[(100, 0)])
+    np.testing.assert_array_equal(bank.source, sources)
+    assert_same_outbreaks(bank, resolved_from_scratch(bank))
+
+
+def edit_summaries(n):
+    # karate club (every node a possible source) next to n zero-probability
+    # nodes that no outbreak can reach
+    G = nx.karate_club_graph()
+    G.add_edges_from(nx.relabel_nodes(nx.gnm_random_graph(n, 2 * n, seed=0), lambda v: f"x{v}").edges())
+    probabilities = [1.0] * 34 + [0.0] * n
+    stream = StreamingSentinels(G, probabilities, k=3, n_sims=200, seed=0)
+    edits = [
+        {'remove_edges': [(0, 1), (32, 33)]},
+        {'add_edges': [(0, 9), (5, 25)]},
+        {'remove_nodes': [2], 'add_nodes': {'new': 1.0}, 'add_edges': [('new', 3), ('new', 4)]},
+    ]
+    summaries = [stream.update(**edit) for edit in edits]
+    assert_same_outbreaks(stream.bank, resolved_from_scratch(stream.bank))
+    return summaries
+
+
+def test_update_work_does_not_grow_with_n():
+    club_size = 35  # the 34 club nodes plus 'new'
+    for n in (1_000, 20_000):
+        for summary in edit_summaries(n):
+            assert summary['affected_outbreaks'] > 0
+            # a re-solved outbreak only resets or lowers times inside the club,
+            # however many nodes the rest of the graph has
+            assert 0 < summary['touched_nodes'] <= summary['affected_outbreaks'] * club_size